@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+批量导入 - 不同行数的 CSV 导入吞吐量（行/秒）与内存峰值
+
+用法: python benchmarks/bulk_import.py [行数，可多个，默认 100000 1000000]
+生成 20 年内随机日期（不排序）、12 个分类的记录；内存峰值由单独一次 tracemalloc 运行测得。
+"""
+
+import os
+import sys
+import csv
+import random
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.data_manager import DataManager
+from core.importer import import_file
+
+
+CATEGORIES = ['工作', '学习', '运动', '睡眠', '阅读', '社交', '家务', '娱乐', '通勤', '休息', '吃饭', '副业']
+DURATIONS = ['0.5', '1', '1.5', '2', '45m', '90m', '1h30m', '2h15m']
+
+
+def generate_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'category', 'duration'])
+        for _ in range(rows):
+            writer.writerow([f"{rng.randint(2006, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                             rng.choice(CATEGORIES), rng.choice(DURATIONS)])
+
+
+def run_import(csv_path, data_dir, backend):
+    data_manager = DataManager(data_dir=data_dir, backend=backend)
+    try:
+        return import_file(data_manager, csv_path)
+    finally:
+        data_manager.close()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    print(f"{'行数':>9} {'后端':>6} {'文件大小':>10} {'吞吐量':>14} {'内存峰值':>9}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'history.csv')
+            generate_csv(csv_path, rows)
+            size_mb = os.path.getsize(csv_path) / 1024 / 1024
+            for backend in ('json', 'sqlite'):
+                with tempfile.TemporaryDirectory() as data_dir:
+                    stats = run_import(csv_path, data_dir, backend)
+                with tempfile.TemporaryDirectory() as data_dir:
+                    tracemalloc.start()
+                    run_import(csv_path, data_dir, backend)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                print(f"{rows:>9} {backend:>6} {size_mb:>7.1f} MB "
+                      f"{stats.rows_per_second:>9,.0f} 行/秒 {peak / 1024 / 1024:>6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
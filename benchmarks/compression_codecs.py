@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+压缩格式对比 - 不同历史长度下各压缩格式的文件大小、写入 / 读取吞吐量与写入时的内存峰值
+
+用法: python benchmarks/compression_codecs.py [年数，可多个，默认 1 5 20]
+吞吐量按未压缩的 JSON 文本大小计算。
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.storage import atomic_write_text, read_json
+from benchmarks.snapshot_format import generate_history
+
+
+CODECS = (None, 'gzip', 'xz', 'lzma')
+SUFFIXES = {None: '', 'gzip': '.gz', 'xz': '.xz', 'lzma': '.lzma'}
+
+
+def main():
+    years_list = [int(arg) for arg in sys.argv[1:]] or [1, 5, 20]
+    print(f"{'年数':>4} {'格式':>6} {'文件大小':>11} {'压缩比':>6} {'写入':>10} {'读取':>10} {'写入内存峰值':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for years in years_list:
+            text = json.dumps(generate_history(years), ensure_ascii=False, indent=2)
+            text_mb = len(text.encode('utf-8')) / 1024 / 1024
+            for codec in CODECS:
+                path = os.path.join(tmp_dir, f'energy_data_{years}.json{SUFFIXES[codec]}')
+
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                atomic_write_text(path, text, codec)
+                write_s = time.perf_counter() - t0
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                t0 = time.perf_counter()
+                read_json(path, codec)
+                read_s = time.perf_counter() - t0
+
+                size = os.path.getsize(path)
+                print(f"{years:>4} {codec or 'json':>6} {size / 1024:>8.1f} KB "
+                      f"{text_mb * 1024 * 1024 / size:>6.1f} "
+                      f"{text_mb / write_s:>6.1f} MB/s {text_mb / read_s:>6.1f} MB/s "
+                      f"{peak / 1024 / 1024:>9.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+四象限视图刷新基准 - 在临时目录中生成任务，测量 refresh_task_list 的耗时
+
+用法: python benchmarks/quadrant_refresh.py [任务数，默认 10000]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+
+from core.data_manager import DataManager
+from core.storage import JsonStorage, ENERGY, TASKS, CATEGORIES
+from gui_pyqt5.quadrant_view_qt import QuadrantViewQt
+
+
+QUADRANTS = ('Q1', 'Q2', 'Q3', 'Q4')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    app = QApplication(sys.argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = JsonStorage({
+            ENERGY: os.path.join(tmp_dir, 'energy_data.json'),
+            TASKS: os.path.join(tmp_dir, 'quadrant_tasks.json'),
+            CATEGORIES: os.path.join(tmp_dir, 'categories_config.json'),
+        })
+        # 延迟写入，生成任务时不逐条落盘
+        data_manager = DataManager(os.path.join(tmp_dir, 'energy_data.json'),
+                                   backend=storage, write_behind_ms=60000)
+        for i in range(count):
+            data_manager.add_task(f'任务 {i}', QUADRANTS[i % len(QUADRANTS)])
+
+        view = QuadrantViewQt(data_manager)
+        view.resize(1200, 900)
+        view.show()
+        app.processEvents()
+
+        started = time.perf_counter()
+        for quadrant_id in QUADRANTS:
+            view.refresh_task_list(quadrant_id)
+        app.processEvents()
+        elapsed = time.perf_counter() - started
+
+        print(f"{count} 个任务，刷新四个象限: {elapsed * 1000:.1f} ms")
+
+        view.close()
+        data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+快照格式对比 - JSON（indent=2）与二进制快照的文件大小、打开并汇总的耗时
+
+用法: python benchmarks/snapshot_format.py [年数，可多个，默认 1 5 20]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.data_manager import DataManager
+from core.binary_snapshot import json_to_snapshot
+
+
+CATEGORIES = ['工作', '学习', '运动', '睡眠', '阅读', '社交', '家务', '娱乐', '通勤', '休息']
+
+
+def generate_history(years, seed=0):
+    """生成 years 年的随机历史：约九成的天有记录，每天 4~8 个分类"""
+    rng = random.Random(seed)
+    first = date(2026 - years, 1, 1)
+    data = {}
+    for i in range((date(2026, 1, 1) - first).days):
+        if rng.random() < 0.9:
+            day = first + timedelta(days=i)
+            data[day.strftime('%Y.%m.%d')] = {
+                category: rng.randint(10, 300)
+                for category in rng.sample(CATEGORIES, rng.randint(4, 8))
+            }
+    return data
+
+
+def measure(data_dir, backend, month_start, month_end, first, last):
+    """新建 DataManager 后汇总一个月、再汇总全部历史，返回两段耗时（毫秒）"""
+    t0 = time.perf_counter()
+    data_manager = DataManager(data_dir=data_dir, backend=backend)
+    data_manager.aggregate_range(month_start, month_end)
+    t1 = time.perf_counter()
+    data_manager.aggregate_range(first, last)
+    t2 = time.perf_counter()
+    data_manager.close()
+    return (t1 - t0) * 1000, (t2 - t1) * 1000
+
+
+def main():
+    years_list = [int(arg) for arg in sys.argv[1:]] or [1, 5, 20]
+    print(f"{'年数':>4} {'格式':>6} {'文件大小':>12} {'打开+汇总一个月':>16} {'再汇总全部':>12}")
+    for years in years_list:
+        data = generate_history(years)
+        month_start, month_end = date(2025, 6, 1), date(2025, 6, 30)
+        first, last = date(2026 - years, 1, 1), date(2025, 12, 31)
+
+        with tempfile.TemporaryDirectory() as json_dir, tempfile.TemporaryDirectory() as bin_dir:
+            json_path = os.path.join(json_dir, 'energy_data.json')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            bin_path = os.path.join(bin_dir, 'energy_data.bin')
+            json_to_snapshot(json_path, bin_path)
+
+            for label, data_dir, backend, path in (('json', json_dir, 'json', json_path),
+                                                   ('binary', bin_dir, 'binary', bin_path)):
+                open_ms, full_ms = measure(data_dir, backend, month_start, month_end, first, last)
+                size_kb = os.path.getsize(path) / 1024
+                print(f"{years:>4} {label:>6} {size_kb:>9.1f} KB {open_ms:>13.2f} ms {full_ms:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+二进制快照 - 精力数据的紧凑只读格式，通过 mmap 按需读取
+
+文件布局（小端）：
+    文件头    64 字节：魔数 b'EDSB'、版本、单元格字节数（2 = uint16 / 4 = int32）、
+              起始日序数、天数、分类数，以及字符串表 / 有记录标记 / 矩阵 / 键顺序的偏移
+    字符串表  每个分类名：u16 字节长度 + UTF-8 字节
+    有记录标记  每天 1 字节（该日期在原数据中存在为 1）
+    键顺序    每天 u32 顺序表序号（按 4 字节对齐）；顺序表：u32 条数 n、n + 1 个 u32 起始位置，
+              之后是各条按当天数据中键顺序排列的分类序号（相同的顺序只存一次；分类不超过
+              65535 个时为 u16，否则为 u32）
+    矩阵      天 × 分类的分钟数，按行连续存放（按 64 字节对齐）
+
+区间汇总只访问区间内那几行所在的页。读取某天时分类按保存时的键顺序排列（与 JSON 存储相同），
+分钟数为 0 的分类项也会保留；版本 1 的文件没有键顺序，只返回非 0 项并按字符串表的顺序排列。
+
+转换: python -m core.binary_snapshot to-bin energy_data.json energy_data.bin
+      python -m core.binary_snapshot to-json energy_data.bin energy_data.json
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import threading
+
+import numpy as np
+
+from core.date_keys import key_ordinal, ordinal_to_key, ordinal_rows
+from core.day_columns import first_seen_order
+from core.day_matrix import DayMatrix
+from core.storage import (JsonStorage, LazyEnergyData, ENERGY, atomic_write_text,
+                          fsync_dir, read_json, detect_codec)
+
+
+MAGIC = b'EDSB'
+VERSION = 2
+# 魔数、版本、单元格字节数、起始日序数、天数、分类数、字符串表偏移与长度、有记录标记偏移、矩阵偏移、
+# 键顺序偏移（版本 1 没有最后一项）
+HEADER = struct.Struct('<4sHHiIIQQQQQ')
+HEADER_V1 = struct.Struct('<4sHHiIIQQQQ')
+HEADER_SIZE = 64
+MATRIX_ALIGN = 64
+
+CELL_DTYPES = {2: np.dtype('<u2'), 4: np.dtype('<i4')}
+
+
+def order_dtype(num_categories):
+    """顺序表中分类序号的类型"""
+    return np.dtype('<u2') if num_categories <= 0xFFFF else np.dtype('<u4')
+
+
+def pack_snapshot(energy_data):
+    """{日期: {分类: 分钟}} -> 快照字节串（无法解析为日期的键被忽略）"""
+    day_rows = ordinal_rows(energy_data)
+    matrix = DayMatrix.build(day_rows)
+    cells = matrix.window(matrix.origin, matrix.origin + matrix.num_days - 1) \
+        if matrix.origin is not None else np.zeros((0, 0), dtype=np.uint16)
+    cell_size = 2 if cells.dtype == np.uint16 else 4
+    cells = np.ascontiguousarray(cells, dtype=CELL_DTYPES[cell_size])
+
+    strings = b''.join(struct.pack('<H', len(encoded)) + encoded
+                       for encoded in (name.encode('utf-8') for name in matrix.categories))
+    present = np.zeros(cells.shape[0], dtype=np.uint8)
+    day_orders = np.zeros(cells.shape[0], dtype='<u4')
+    category_ids = {category: cid for cid, category in enumerate(matrix.categories)}
+    orders = {}             # (分类序号, ...) -> 顺序表序号
+    for ordinal, row in day_rows.items():
+        present[ordinal - matrix.origin] = 1
+        order = tuple(category_ids[category] for category in row)
+        day_orders[ordinal - matrix.origin] = orders.setdefault(order, len(orders))
+    starts = np.zeros(len(orders) + 1, dtype='<u4')
+    starts[1:] = np.cumsum([len(order) for order in orders], dtype=np.int64)
+    order_cids = np.fromiter((cid for order in orders for cid in order),
+                             dtype=order_dtype(len(matrix.categories)), count=int(starts[-1]))
+    order_table = struct.pack('<I', len(orders)) + starts.tobytes() + order_cids.tobytes()
+
+    strings_offset = HEADER_SIZE
+    present_offset = strings_offset + len(strings)
+    order_offset = -(-(present_offset + present.size) // 4) * 4
+    orders_end = order_offset + day_orders.nbytes + len(order_table)
+    matrix_offset = -(-orders_end // MATRIX_ALIGN) * MATRIX_ALIGN
+    header = HEADER.pack(MAGIC, VERSION, cell_size, matrix.origin or 0, cells.shape[0],
+                         len(matrix.categories), strings_offset, len(strings),
+                         present_offset, matrix_offset, order_offset)
+    return b''.join([header.ljust(HEADER_SIZE, b'\0'), strings, present.tobytes(),
+                     b'\0' * (order_offset - present_offset - present.size),
+                     day_orders.tobytes(), order_table,
+                     b'\0' * (matrix_offset - orders_end), cells.tobytes()])
+
+
+def write_snapshot(path, energy_data):
+    """原子写入快照文件：临时文件 + fsync + os.replace"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(pack_snapshot(energy_data))
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    fsync_dir(path)
+
+
+class BinarySnapshot:
+    """内存映射打开的快照文件，矩阵为直接指向映射内存的 numpy 视图"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from('<4sH', self._mm, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            self._mm.close()
+            raise ValueError(f"不是有效的快照文件: {path}")
+        order_offset = None
+        if version == 1:
+            (_, _, cell_size, self.origin, self.num_days, num_categories,
+             strings_offset, strings_size, present_offset, matrix_offset) = \
+                HEADER_V1.unpack_from(self._mm, 0)
+        else:
+            (_, _, cell_size, self.origin, self.num_days, num_categories,
+             strings_offset, strings_size, present_offset, matrix_offset, order_offset) = \
+                HEADER.unpack_from(self._mm, 0)
+        if cell_size not in CELL_DTYPES:
+            self._mm.close()
+            raise ValueError(f"不是有效的快照文件: {path}")
+
+        self.categories = []
+        pos = strings_offset
+        for _ in range(num_categories):
+            (length,) = struct.unpack_from('<H', self._mm, pos)
+            self.categories.append(self._mm[pos + 2:pos + 2 + length].decode('utf-8'))
+            pos += 2 + length
+
+        self.present = np.frombuffer(self._mm, dtype=np.uint8, count=self.num_days,
+                                     offset=present_offset)
+        self.matrix = np.frombuffer(self._mm, dtype=CELL_DTYPES[cell_size],
+                                    count=self.num_days * num_categories,
+                                    offset=matrix_offset).reshape(self.num_days, num_categories)
+
+        # 每天的键顺序：第 i 条顺序为 _order_cids[_order_starts[i]:_order_starts[i + 1]]
+        # （版本 1 没有键顺序，均为 None）
+        self.day_orders = self._order_starts = self._order_cids = None
+        if order_offset is not None:
+            self.day_orders = np.frombuffer(self._mm, dtype='<u4', count=self.num_days,
+                                            offset=order_offset)
+            pos = order_offset + self.day_orders.nbytes
+            (num_orders,) = struct.unpack_from('<I', self._mm, pos)
+            self._order_starts = np.frombuffer(self._mm, dtype='<u4', count=num_orders + 1,
+                                               offset=pos + 4)
+            self._order_cids = np.frombuffer(self._mm, dtype=order_dtype(num_categories),
+                                             count=int(self._order_starts[-1]),
+                                             offset=pos + 4 + self._order_starts.nbytes)
+
+    def _row_of(self, ordinal):
+        offset = ordinal - self.origin
+        if 0 <= offset < self.num_days and self.present[offset]:
+            return offset
+        return None
+
+    def _day_cids(self, offset):
+        """某行保存的分类序号，按保存时的键顺序"""
+        if self.day_orders is None:
+            return np.flatnonzero(self.matrix[offset]).tolist()
+        i = self.day_orders[offset]
+        return self._order_cids[self._order_starts[i]:self._order_starts[i + 1]].tolist()
+
+    def day(self, ordinal):
+        """某天的 {分类: 分钟}（按保存时的键顺序），没有记录返回 None"""
+        offset = self._row_of(ordinal)
+        if offset is None:
+            return None
+        row = self.matrix[offset].tolist()
+        return {self.categories[cid]: row[cid] for cid in self._day_cids(offset)}
+
+    def day_keys(self, ordinal):
+        """某天的分类列表（按保存时的键顺序），没有记录返回 None"""
+        offset = self._row_of(ordinal)
+        if offset is None:
+            return None
+        return [self.categories[cid] for cid in self._day_cids(offset)]
+
+    def ordinals(self, start=None, end=None):
+        """[start, end] 内有记录的日序数（升序）"""
+        lo = 0 if start is None else min(max(start - self.origin, 0), self.num_days)
+        hi = self.num_days if end is None else min(max(end - self.origin + 1, 0), self.num_days)
+        if lo >= hi:
+            return []
+        return (np.flatnonzero(self.present[lo:hi]) + lo + self.origin).tolist()
+
+    def range_vector(self, start, end):
+        """[start, end] 内各分类分钟数之和（只读取这些行所在的页）"""
+        lo = min(max(start - self.origin, 0), self.num_days)
+        hi = min(max(end - self.origin + 1, 0), self.num_days)
+        if lo >= hi:
+            return np.zeros(len(self.categories), dtype=np.int64)
+        return self.matrix[lo:hi].sum(axis=0, dtype=np.int64)
+
+    def first_days(self, start, end, skip=()):
+        """[start, end] 内各分类第一次有分钟数的日序数 {分类: 日序数}，不考虑 skip 中的日子"""
+        lo = min(max(start - self.origin, 0), self.num_days)
+        hi = min(max(end - self.origin + 1, 0), self.num_days)
+        if lo >= hi:
+            return {}
+        nonzero = self.matrix[lo:hi] != 0
+        for ordinal in skip:
+            if lo <= ordinal - self.origin < hi:
+                nonzero[ordinal - self.origin - lo] = False
+        rows = nonzero.argmax(axis=0)
+        return {self.categories[cid]: self.origin + lo + int(rows[cid])
+                for cid in np.flatnonzero(nonzero.any(axis=0))}
+
+    def close(self):
+        self.present = self.matrix = None
+        self.day_orders = self._order_starts = self._order_cids = None
+        try:
+            self._mm.close()
+        except BufferError:
+            # 仍有外部 numpy 视图引用映射内存，交给垃圾回收释放
+            pass
+
+
+class SnapshotEnergyData(LazyEnergyData):
+    """快照之上的精力数据文档：读取直接访问映射内存，修改先记在内存中，写回时重新生成快照"""
+
+    def __init__(self, snapshot, changes=None):
+        self.snapshot = snapshot
+        self._changes = dict(changes or {})     # 日期 -> 新的 {分类: 分钟}，None 表示已删除
+
+    def pending_changes(self):
+        """尚未写入快照的修改（副本）"""
+        return dict(self._changes)
+
+    def rebase(self, snapshot, written=None):
+        """写回完成后切换到新快照，清空内存中的修改
+
+        written 为写入快照的那部分修改（pending_changes() 的结果）时只清除这些，
+        写入期间新的修改保留在内存中。
+        """
+        old, self.snapshot = self.snapshot, snapshot
+        if written is None:
+            self._changes = {}
+        else:
+            for key, value in written.items():
+                if key in self._changes and self._changes[key] is value:
+                    del self._changes[key]
+        if old is not None:
+            old.close()
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            value = self._changes[key]
+            if value is None:
+                raise KeyError(key)
+            return value
+        ordinal = key_ordinal(key)
+        value = None if ordinal is None else self.snapshot.day(ordinal)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._changes[key] = value
+
+    def __delitem__(self, key):
+        self[key]
+        self._changes[key] = None
+
+    def _keys(self, start=None, end=None):
+        keys = {ordinal_to_key(ordinal) for ordinal in self.snapshot.ordinals(start, end)}
+        for key, value in list(self._changes.items()):
+            ordinal = key_ordinal(key)
+            if start is not None and (ordinal is None or ordinal < start):
+                continue
+            if end is not None and (ordinal is None or ordinal > end):
+                continue
+            if value is None:
+                keys.discard(key)
+            else:
+                keys.add(key)
+        return sorted(keys)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def range_items(self, start, end):
+        for key in self._keys(start, end):
+            yield key, dict(self[key])
+
+    def aggregate(self, start, end):
+        """[start, end] 内各分类的分钟数，按分类在区间内第一次出现的日期排序"""
+        snapshot = self.snapshot
+        totals = dict(zip(snapshot.categories, snapshot.range_vector(start, end).tolist()))
+        # 用内存中的修改修正快照中的对应日期
+        changed = {}            # 日序数 -> 新的数据，None 表示已删除
+        for key, value in list(self._changes.items()):
+            ordinal = key_ordinal(key)
+            if ordinal is not None and start <= ordinal <= end:
+                changed[ordinal] = value
+        for ordinal, value in changed.items():
+            for category, minutes in (snapshot.day(ordinal) or {}).items():
+                totals[category] -= minutes
+            for category, minutes in (value or {}).items():
+                totals[category] = totals.get(category, 0) + minutes
+
+        first_days = snapshot.first_days(start, end, skip=changed)
+        for ordinal, value in sorted(changed.items()):
+            for category, minutes in (value or {}).items():
+                if minutes and first_days.get(category, ordinal + 1) > ordinal:
+                    first_days[category] = ordinal
+        first_days = {category: ordinal for category, ordinal in first_days.items()
+                      if totals.get(category)}
+        # 同一天第一次出现的分类按当天的键顺序：内存中修改过的日子取修改后的数据
+        order = first_seen_order(
+            first_days, lambda ordinal: changed[ordinal] if ordinal in changed else snapshot.day_keys(ordinal))
+        return {category: totals[category] for category in order}
+
+
+class BinarySnapshotStorage(JsonStorage):
+    """精力数据使用二进制快照的存储，任务和分类仍为 JSON 文件
+
+    写回精力数据时重新生成整个快照（适合很少修改的历史归档）。
+    """
+
+    def __init__(self, paths, snapshot_path, commit_window=0.0):
+        super().__init__(paths, commit_window=commit_window)
+        self.snapshot_path = snapshot_path
+        self._energy = None
+        self._energy_lock = threading.Lock()
+
+    def exists(self, name):
+        if name != ENERGY:
+            return super().exists(name)
+        return self._energy is not None or os.path.exists(self.snapshot_path)
+
+    def read(self, name):
+        if name != ENERGY:
+            return super().read(name)
+        with self._energy_lock:
+            if self._energy is None:
+                if not os.path.exists(self.snapshot_path):
+                    return None
+                self.cache_misses += 1
+                self._energy = SnapshotEnergyData(BinarySnapshot(self.snapshot_path))
+            else:
+                self.cache_hits += 1
+            return self._energy
+
+    def freeze(self, name, doc, changes=None):
+        if name != ENERGY or doc is not self._energy:
+            return super().freeze(name, doc, changes)
+        # 快照本身不会被修改，只需复制内存中的修改；写入期间的新修改在 rebase 后保留
+        return None, doc.pending_changes()
+
+    def write(self, name, doc, changes=None, frozen=None):
+        if name != ENERGY:
+            super().write(name, doc, changes, frozen)
+            return
+        with self._energy_lock:
+            started = time.perf_counter()
+            written = None
+            if frozen is None:
+                data = dict(doc.items())
+            elif doc is self._energy:
+                written = frozen[1]
+                data = dict(SnapshotEnergyData(doc.snapshot, written).items())
+            else:
+                data = frozen[0]
+            current = self._energy
+            # Windows 不允许替换仍被映射的文件，先关闭旧映射
+            remap = os.name == 'nt' and current is not None
+            if remap:
+                current.snapshot.close()
+            try:
+                write_snapshot(self.snapshot_path, data)
+            except Exception:
+                if remap:
+                    current.snapshot = BinarySnapshot(self.snapshot_path)
+                raise
+
+            snapshot = BinarySnapshot(self.snapshot_path)
+            if current is None:
+                self._energy = SnapshotEnergyData(snapshot)
+            else:
+                current.rebase(snapshot, written)
+            self._record_commit(time.perf_counter() - started)
+
+    def invalidate(self):
+        super().invalidate()
+        with self._energy_lock:
+            if self._energy is not None:
+                self._energy.snapshot.close()
+            self._energy = None
+
+    def close(self):
+        super().close()
+        with self._energy_lock:
+            if self._energy is not None:
+                self._energy.snapshot.close()
+
+
+def json_to_snapshot(json_path, snapshot_path):
+    """把 energy_data.json（可以是压缩的）转换为二进制快照，返回写入的字节数"""
+    write_snapshot(snapshot_path, read_json(json_path, detect_codec(json_path)))
+    return os.path.getsize(snapshot_path)
+
+
+def snapshot_to_json(snapshot_path, json_path):
+    """把二进制快照转换回与应用相同格式的 JSON（indent=2），返回天数"""
+    snapshot = BinarySnapshot(snapshot_path)
+    try:
+        data = {ordinal_to_key(ordinal): snapshot.day(ordinal) for ordinal in snapshot.ordinals()}
+    finally:
+        snapshot.close()
+    atomic_write_text(json_path, json.dumps(data, ensure_ascii=False, indent=2), detect_codec(json_path))
+    return len(data)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in ('to-bin', 'to-json'):
+        print("用法: python -m core.binary_snapshot to-bin|to-json 源文件 目标文件")
+        sys.exit(2)
+    if sys.argv[1] == 'to-bin':
+        size = json_to_snapshot(sys.argv[2], sys.argv[3])
+        print(f"已写入 {sys.argv[3]}（{size} 字节）")
+    else:
+        days = snapshot_to_json(sys.argv[2], sys.argv[3])
+        print(f"已写入 {sys.argv[3]}（{days} 天）")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+图表缓存 - 按数据指纹缓存渲染好的 RGBA 图像，超出内存上限时淘汰最久未使用的
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+
+# 默认缓存上限：64 MB（一张 11 英寸宽的图表在 100 dpi 下约 2~4 MB）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 渲染结果：像素宽高、渲染 dpi、RGBA 字节（按行排列，每像素 4 字节）
+RenderedChart = namedtuple('RenderedChart', 'width height dpi rgba')
+
+
+def chart_fingerprint(data_dict, title, dpi):
+    """(数据, 标题, 尺寸) 的指纹，数据按插入顺序参与计算（顺序决定颜色和图例顺序）"""
+    payload = repr((tuple(data_dict.items()), title, dpi)).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ChartCache:
+    """线程安全的 LRU 缓存，同时限制总字节数和（可选的）条目数"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # 指纹 -> RenderedChart，最近使用的在末尾
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """命中时返回 RenderedChart 并标记为最近使用，否则返回 None"""
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return chart
+
+    def peek(self, key):
+        """查看是否已缓存，不计入统计、不改变淘汰顺序"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, chart):
+        """加入缓存，超过上限时淘汰最久未使用的条目；单张超过上限的图表不缓存"""
+        size = len(chart.rgba)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.rgba)
+            self._entries[key] = chart
+            self._bytes += size
+
+            while self._bytes > self.max_bytes or \
+                    (self.max_entries is not None and len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.rgba)
+                self.evictions += 1
+
+    def invalidate(self):
+        """清空缓存（数据被修改后调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        """命中、淘汰统计与当前占用"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -3,212 +3,421 @@
 图表生成器 - 固定饼图尺寸，动态扩展高度
 """
 
-import matplotlib
-matplotlib.use('Agg')
+import json
+import math
+import os
+import threading
+import time
 
-from matplotlib.figure import Figure
-from matplotlib.patches import FancyBboxPatch
-import matplotlib.font_manager as fm
+from core.chart_cache import ChartCache, RenderedChart, chart_fingerprint, DEFAULT_MAX_BYTES
+
+
+# 中文字体候选（按优先级）
+FONT_CANDIDATES = [
+    'Heiti TC',
+    'PingFang SC', 
+    'STHeiti',
+    'Hiragino Sans GB',
+    'Arial Unicode MS',
+]
+
+# 字体查找结果的缓存文件（放在 matplotlib 的缓存目录中）
+FONT_CACHE_NAME = 'energy_font_cache.json'
+
+# 以下名称在首次绘图时由 load_matplotlib() 填充，导入本模块时不加载 matplotlib
+Figure = FancyBboxPatch = Wedge = FigureCanvasAgg = None
+CHINESE_FONT = None
+
+_load_lock = threading.Lock()
+_load_times = {}    # 阶段 -> 耗时（秒），按加载顺序排列
 
 
 def get_chinese_font():
-    """获取可用的中文字体"""
-    font_list = [
-        'Heiti TC',
-        'PingFang SC', 
-        'STHeiti',
-        'Hiragino Sans GB',
-        'Arial Unicode MS',
-    ]
-    
+    """获取可用的中文字体（遍历 matplotlib 的全部字体）"""
+    import matplotlib.font_manager as fm
+
     available_fonts = set(f.name for f in fm.fontManager.ttflist)
     
-    for font in font_list:
+    for font in FONT_CANDIDATES:
         if font in available_fonts:
             return font
     
     return 'sans-serif'
 
 
-CHINESE_FONT = get_chinese_font()
-matplotlib.rcParams['font.family'] = [CHINESE_FONT, 'sans-serif']
-matplotlib.rcParams['axes.unicode_minus'] = False
+def _resolve_font(matplotlib):
+    """读取字体缓存文件，未命中时查找字体并写回缓存，返回 (字体, 是否命中缓存)
 
+    缓存以 matplotlib 版本和候选字体列表为键。matplotlib 自身的字体列表缓存同样只在
+    版本变化时重建，因此新安装字体后需要和它一起删除缓存目录。
+    """
+    path = os.path.join(matplotlib.get_cachedir(), FONT_CACHE_NAME)
+    key = {'matplotlib': matplotlib.__version__, 'fonts': FONT_CANDIDATES}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['font'], True
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    font = get_chinese_font()
+    try:
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'font': font}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    return font, False
+
+
+def load_matplotlib():
+    """首次绘图前调用：加载 matplotlib（Agg 后端）与绘图模块并确定中文字体，返回字体名
+
+    只在第一次调用时真正加载，可在任意线程调用。
+    """
+    global Figure, FancyBboxPatch, Wedge, FigureCanvasAgg, CHINESE_FONT
+    if CHINESE_FONT is not None:
+        return CHINESE_FONT
+
+    with _load_lock:
+        if CHINESE_FONT is not None:
+            return CHINESE_FONT
+
+        t0 = time.perf_counter()
+        import matplotlib
+        matplotlib.use('Agg')
+        t1 = time.perf_counter()
+
+        font, cached = _resolve_font(matplotlib)
+        matplotlib.rcParams['font.family'] = [font, 'sans-serif']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        t2 = time.perf_counter()
+
+        from matplotlib.figure import Figure
+        from matplotlib.patches import FancyBboxPatch, Wedge
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        t3 = time.perf_counter()
+
+        _load_times['import matplotlib'] = t1 - t0
+        _load_times['字体查找（缓存）' if cached else '字体查找'] = t2 - t1
+        _load_times['import figure / backend'] = t3 - t2
+        CHINESE_FONT = font
+    return CHINESE_FONT
+
+
+def load_times():
+    """matplotlib 加载各阶段的耗时（秒），尚未加载时为空"""
+    return dict(_load_times)
+
+
+# ========== 固定尺寸参数（单位：英寸） ==========
+FIG_WIDTH = 11.0          # 图表总宽度
+TITLE_HEIGHT = 0.7        # 标题区域高度
+PIE_SIZE = 4.5            # 饼图固定尺寸（宽=高）
+BOTTOM_MARGIN = 0.3       # 底部边距
+
+# 图例参数
+LEGEND_ITEM_HEIGHT = 0.42  # 每个图例项高度
+LEGEND_TITLE_HEIGHT = 0.6  # 图例标题高度
+LEGEND_PADDING = 0.4       # 图例上下内边距
+
+# 甜甜圈参数（与 ax.pie 的 startangle / pctdistance / wedgeprops 对应）
+START_ANGLE = 90
+PCT_DISTANCE = 0.75
+RING_WIDTH = 0.45
+
+# 颜色配置
+COLORS = [
+    '#3B82F6',  # 蓝色
+    '#10B981',  # 翠绿
+    '#F59E0B',  # 琥珀
+    '#EF4444',  # 红色
+    '#8B5CF6',  # 紫色
+    '#06B6D4',  # 青色
+    '#EC4899',  # 粉色
+    '#6366F1',  # 靛蓝
+    '#F97316',  # 橙色
+    '#14B8A6',  # 蓝绿
+    '#A855F7',  # 亮紫
+    '#64748B',  # 灰色
+    '#DC2626',  # 深红
+    '#059669',  # 深绿
+    '#7C3AED',  # 深紫
+    '#0891B2',  # 深青
+]
 
-class ChartGenerator:
-    def __init__(self):
-        self.font_family = CHINESE_FONT
-    
-    def create_pie_chart(self, data_dict, title="精力分配"):
-        """创建饼图 - 固定饼图尺寸，根据图例数量动态调整总高度"""
-        if not data_dict:
-            return None
 
+class PieChartFigure:
+    """可复用的甜甜圈图 Figure - 数据变化时原地更新扇区、图例行和中心文字
+
+    只有分类数量变化时才增删扇区和图例行、调整图表高度，其余情况只修改已有图形元素的属性。
+    """
+
+    def __init__(self, font_family):
+        self.font_family = font_family
+        self.num_items = None
+
+        self.figure = Figure(figsize=(FIG_WIDTH, PIE_SIZE), dpi=100, facecolor='#FFFFFF')
+        self.ax = self.figure.add_axes([0, 0, 1, 1], facecolor='#FFFFFF')
+        self.ax.set_aspect('equal')
+        self.ax.set(frame_on=False, xticks=[], yticks=[], xlim=(-1.25, 1.25), ylim=(-1.25, 1.25))
+
+        self.wedges = []
+        self.pct_texts = []
+        self.legend_rows = []       # [(颜色方块, 分类名称, 时长), ...]
+
+        # 中心文字
+        self.total_text = self.ax.text(0, 0.06, '', fontsize=32, fontweight='bold',
+                                       ha='center', va='center', color='#2D3748',
+                                       fontfamily=font_family)
+        self.ax.text(0, -0.18, '小时', fontsize=14,
+                     ha='center', va='center', color='#718096',
+                     fontfamily=font_family)
+
+        # 标题
+        self.title_text = self.figure.text(0.30, 0, '', fontsize=18, fontweight='bold',
+                                           ha='center', va='center', color='#2D3748',
+                                           fontfamily=font_family)
+
+        # 图例背景框与标题
+        self.legend_box = FancyBboxPatch(
+            (0, 0), 0, 0,
+            boxstyle="round,pad=0.015,rounding_size=0.02",
+            facecolor='#F8FAFC',
+            edgecolor='#E2E8F0',
+            linewidth=1.5,
+            transform=self.figure.transFigure,
+            zorder=0
+        )
+        self.figure.patches.append(self.legend_box)
+        self.legend_title = self.figure.text(0, 0, '分类详情',
+                                             fontsize=14, fontweight='bold', color='#2D3748',
+                                             fontfamily=font_family, ha='center', va='top')
+
+    def update(self, data_dict, title):
+        """按新数据更新图形元素，返回 Figure"""
         labels = list(data_dict.keys())
         sizes = list(data_dict.values())
         total = sum(sizes)
-        
-        if total == 0:
-            return None
 
-        num_items = len(labels)
-        
-        # ========== 固定尺寸参数（单位：英寸） ==========
-        FIG_WIDTH = 11.0          # 图表总宽度
-        TITLE_HEIGHT = 0.7        # 标题区域高度
-        PIE_SIZE = 4.5            # 饼图固定尺寸（宽=高）
-        BOTTOM_MARGIN = 0.3       # 底部边距
-        
-        # 图例参数
-        LEGEND_ITEM_HEIGHT = 0.42  # 每个图例项高度
-        LEGEND_TITLE_HEIGHT = 0.6  # 图例标题高度
-        LEGEND_PADDING = 0.4       # 图例上下内边距
-        
+        if len(labels) != self.num_items:
+            self._set_item_count(len(labels))
+
+        colors = [COLORS[i % len(COLORS)] for i in range(len(labels))]
+
+        # 扇区与百分比（与 ax.pie 相同：从 startangle 起逆时针排列）
+        theta1 = START_ANGLE / 360
+        for wedge, pct_text, size, color in zip(self.wedges, self.pct_texts, sizes, colors):
+            frac = size / total
+            theta2 = theta1 + frac
+            wedge.set_theta1(360. * theta1)
+            wedge.set_theta2(360. * theta2)
+            wedge.set_facecolor(color)
+
+            thetam = math.pi * (theta1 + theta2)
+            pct_text.set_position((PCT_DISTANCE * math.cos(thetam), PCT_DISTANCE * math.sin(thetam)))
+            pct = 100. * frac
+            pct_text.set_text(f'{pct:.1f}%' if pct > 5 else '')
+            theta1 = theta2
+
+        self.total_text.set_text(f'{total:.1f}')
+        self.title_text.set_text(title)
+
+        # 图例行
+        rows = zip(self.legend_rows, labels, sizes, colors)
+        for (color_box, label_text, value_text), label, size, color in rows:
+            color_box.set_facecolor(color)
+            label_text.set_text(label)
+            value_text.set_text(f'{size:.1f}h')
+
+        return self.figure
+
+    def _set_item_count(self, num_items):
+        """分类数量变化：增删扇区和图例行，并按新高度重新布局"""
+        while len(self.wedges) < num_items:
+            wedge = Wedge((0, 0), 1, 0, 0, width=RING_WIDTH,
+                          edgecolor='white', linewidth=2, clip_on=False)
+            self.ax.add_patch(wedge)
+            self.wedges.append(wedge)
+            pct_text = self.ax.text(0, 0, '', clip_on=False, ha='center', va='center',
+                                    fontsize=11, fontweight='bold', color='#2D3748')
+            self.pct_texts.append(pct_text)
+
+            box_size = 0.018
+            color_box = FancyBboxPatch(
+                (0, 0), box_size * 1.2, box_size,
+                boxstyle="round,pad=0.002,rounding_size=0.005",
+                edgecolor='none',
+                transform=self.figure.transFigure,
+                zorder=1
+            )
+            self.figure.patches.append(color_box)
+            label_text = self.figure.text(0, 0, '',
+                                          fontsize=13, color='#2D3748', va='center',
+                                          fontfamily=self.font_family)
+            value_text = self.figure.text(0, 0, '',
+                                          fontsize=13, fontweight='bold', color='#4A5568',
+                                          va='center', ha='right',
+                                          fontfamily=self.font_family)
+            self.legend_rows.append((color_box, label_text, value_text))
+
+        while len(self.wedges) > num_items:
+            self.wedges.pop().remove()
+            self.pct_texts.pop().remove()
+            color_box, label_text, value_text = self.legend_rows.pop()
+            self.figure.patches.remove(color_box)
+            label_text.remove()
+            value_text.remove()
+
+        self.num_items = num_items
+        self._layout()
+
+    def _layout(self):
+        """固定饼图尺寸，根据图例数量计算总高度和各元素位置"""
+        num_items = self.num_items
+
         # ========== 计算所需高度 ==========
-        # 左侧：饼图需要的高度
-        left_content_height = PIE_SIZE
-        
-        # 右侧：图例需要的高度
+        # 左侧：饼图需要的高度；右侧：图例需要的高度；内容区取最大值
         right_content_height = LEGEND_TITLE_HEIGHT + num_items * LEGEND_ITEM_HEIGHT + LEGEND_PADDING
-        
-        # 内容区取最大值
-        content_height = max(left_content_height, right_content_height)
-        
-        # 总高度
+        content_height = max(PIE_SIZE, right_content_height)
         fig_height = TITLE_HEIGHT + content_height + BOTTOM_MARGIN
-        
-        # ========== 创建图表 ==========
-        fig = Figure(figsize=(FIG_WIDTH, fig_height), dpi=100, facecolor='#FFFFFF')
-        
-        # ========== 饼图（使用绝对坐标，固定大小） ==========
-        # 转换为相对坐标
-        pie_left = 0.06
-        pie_bottom = BOTTOM_MARGIN / fig_height
-        pie_width = PIE_SIZE / FIG_WIDTH
-        pie_height = PIE_SIZE / fig_height
-        
-        ax = fig.add_axes([pie_left, pie_bottom, pie_width, pie_height], facecolor='#FFFFFF')
-
-        # 颜色配置
-        colors = [
-            '#3B82F6',  # 蓝色
-            '#10B981',  # 翠绿
-            '#F59E0B',  # 琥珀
-            '#EF4444',  # 红色
-            '#8B5CF6',  # 紫色
-            '#06B6D4',  # 青色
-            '#EC4899',  # 粉色
-            '#6366F1',  # 靛蓝
-            '#F97316',  # 橙色
-            '#14B8A6',  # 蓝绿
-            '#A855F7',  # 亮紫
-            '#64748B',  # 灰色
-            '#DC2626',  # 深红
-            '#059669',  # 深绿
-            '#7C3AED',  # 深紫
-            '#0891B2',  # 深青
-        ]
-        
-        while len(colors) < len(labels):
-            colors.extend(colors)
-        colors = colors[:len(labels)]
-
-        # 绘制甜甜圈图
-        wedges, texts, autotexts = ax.pie(
-            sizes,
-            labels=None,
-            colors=colors,
-            autopct=lambda pct: f'{pct:.1f}%' if pct > 5 else '',
-            startangle=90,
-            pctdistance=0.75,
-            wedgeprops=dict(width=0.45, edgecolor='white', linewidth=2)
-        )
-        
-        # 百分比文字样式
-        for autotext in autotexts:
-            autotext.set_fontsize(11)
-            autotext.set_fontweight('bold')
-            autotext.set_color('#2D3748')
+        self.figure.set_size_inches(FIG_WIDTH, fig_height)
 
-        # 中心文字
-        ax.text(0, 0.06, f'{total:.1f}', fontsize=32, fontweight='bold',
-                ha='center', va='center', color='#2D3748',
-                fontfamily=self.font_family)
-        ax.text(0, -0.18, '小时', fontsize=14,
-                ha='center', va='center', color='#718096',
-                fontfamily=self.font_family)
+        # ========== 饼图（使用绝对坐标，固定大小） ==========
+        self.ax.set_position([0.06, BOTTOM_MARGIN / fig_height,
+                              PIE_SIZE / FIG_WIDTH, PIE_SIZE / fig_height])
 
         # ========== 标题 ==========
-        title_y = 1 - (TITLE_HEIGHT * 0.5 / fig_height)
-        fig.text(0.30, title_y, title, fontsize=18, fontweight='bold',
-                 ha='center', va='center', color='#2D3748',
-                 fontfamily=self.font_family)
+        self.title_text.set_position((0.30, 1 - (TITLE_HEIGHT * 0.5 / fig_height)))
 
         # ========== 右侧图例 ==========
         legend_x = 0.54
-        
-        # 图例起始Y坐标（从标题下方开始）
         legend_top = 1 - (TITLE_HEIGHT / fig_height) - 0.02
-        
+
         # 转换间距为相对坐标
         item_spacing = LEGEND_ITEM_HEIGHT / fig_height
         title_offset = LEGEND_TITLE_HEIGHT / fig_height
-        
-        # 图例标题位置
+
         legend_title_y = legend_top - 0.02
-        
-        # 图例项起始位置
         legend_items_start = legend_title_y - title_offset
-        
-        # ========== 图例背景框 ==========
-        box_left = legend_x - 0.02
+
+        # 图例背景框
         box_top = legend_top + 0.02
         box_bottom = legend_items_start - num_items * item_spacing - 0.02
-        box_width = 0.44
-        box_height = box_top - box_bottom
-        
-        legend_box = FancyBboxPatch(
-            (box_left, box_bottom),
-            box_width, box_height,
-            boxstyle="round,pad=0.015,rounding_size=0.02",
-            facecolor='#F8FAFC',
-            edgecolor='#E2E8F0',
-            linewidth=1.5,
-            transform=fig.transFigure,
-            zorder=0
-        )
-        fig.patches.append(legend_box)
-        
-        # 图例标题
-        fig.text(legend_x + 0.20, legend_title_y, '分类详情', 
-                 fontsize=14, fontweight='bold', color='#2D3748',
-                 fontfamily=self.font_family, ha='center', va='top')
-        
-        # 绘制图例项
-        for i, (label, size, color) in enumerate(zip(labels, sizes, colors)):
+        self.legend_box.set_bounds(legend_x - 0.02, box_bottom, 0.44, box_top - box_bottom)
+        self.legend_title.set_position((legend_x + 0.20, legend_title_y))
+
+        # 图例项
+        box_size = 0.018
+        for i, (color_box, label_text, value_text) in enumerate(self.legend_rows):
             y_pos = legend_items_start - i * item_spacing - item_spacing * 0.5
-            
-            # 颜色方块
-            box_size = 0.018
-            color_box = FancyBboxPatch(
-                (legend_x, y_pos - box_size/2), box_size * 1.2, box_size,
-                boxstyle="round,pad=0.002,rounding_size=0.005",
-                facecolor=color,
-                edgecolor='none',
-                transform=fig.transFigure,
-                zorder=1
-            )
-            fig.patches.append(color_box)
-            
-            # 分类名称
-            fig.text(legend_x + 0.04, y_pos, label,
-                    fontsize=13, color='#2D3748', va='center',
-                    fontfamily=self.font_family)
-            
-            # 时长
-            fig.text(legend_x + 0.40, y_pos, f'{size:.1f}h',
-                    fontsize=13, fontweight='bold', color='#4A5568', 
-                    va='center', ha='right',
-                    fontfamily=self.font_family)
-
-        return fig
+            color_box.set_x(legend_x)
+            color_box.set_y(y_pos - box_size / 2)
+            label_text.set_position((legend_x + 0.04, y_pos))
+            value_text.set_position((legend_x + 0.40, y_pos))
+
+
+class ChartGenerator:
+    def __init__(self, cache_bytes=DEFAULT_MAX_BYTES, cache_entries=None):
+        """cache_bytes / cache_entries: 渲染结果缓存的内存上限和条目上限（None 表示不限条目数）"""
+        self.cache = ChartCache(cache_bytes, cache_entries)
+        # 绘制复用的 Figure 与 Agg 画布，可能在后台线程中使用，由 _render_lock 保护
+        self._chart = None
+        self._canvas = None
+        self._render_lock = threading.Lock()
+
+    @property
+    def font_family(self):
+        """图表字体（首次访问时加载 matplotlib）"""
+        return load_matplotlib()
+
+    def render_pie_chart(self, data_dict, title="精力分配", dpi=100):
+        """把饼图渲染为 RGBA 图像（RenderedChart），无数据时返回 None
+
+        结果按 (数据, 标题, dpi) 的指纹缓存，数据未变化时不再绘制。
+        """
+        if not data_dict or sum(data_dict.values()) == 0:
+            return None
+        chart = self.cached_pie_chart(data_dict, title, dpi)
+        if chart is not None:
+            return chart
+        return self.draw_pie_chart(data_dict, title, dpi)
+
+    def cached_pie_chart(self, data_dict, title="精力分配", dpi=100):
+        """只查缓存，未命中返回 None"""
+        return self.cache.get(chart_fingerprint(data_dict, title, dpi))
+
+    def draw_pie_chart(self, data_dict, title="精力分配", dpi=100):
+        """绘制饼图并放入缓存（可在后台线程调用），无数据时返回 None
+
+        复用同一个 Figure / 画布，只原地更新图形元素后重绘。
+        """
+        if not data_dict or sum(data_dict.values()) == 0:
+            return None
+
+        key = chart_fingerprint(data_dict, title, dpi)
+        with self._render_lock:
+            # 等锁期间可能已有其他线程画好了同一张图
+            chart = self.cache.peek(key)
+            if chart is not None:
+                return chart
+
+            fig = self._update_figure(data_dict, title)
+            if fig.get_dpi() != dpi:
+                fig.set_dpi(dpi)
+            self._canvas.draw()
+            width, height = self._canvas.get_width_height()
+            chart = RenderedChart(width, height, dpi, bytes(self._canvas.buffer_rgba()))
+        self.cache.put(key, chart)
+        return chart
+
+    def save_pie_chart(self, data_dict, path, title="精力分配", dpi=100):
+        """把饼图保存为文件，格式由扩展名决定（.png / .svg / .pdf 等），无数据时返回 False
+
+        与 draw_pie_chart 共用同一个 Figure，不经过缓存。
+        """
+        if not data_dict or sum(data_dict.values()) == 0:
+            return False
+
+        with self._render_lock:
+            fig = self._update_figure(data_dict, title)
+            fig.savefig(path, dpi=dpi, facecolor=fig.get_facecolor())
+        return True
+
+    def _update_figure(self, data_dict, title):
+        """原地更新复用的 Figure（调用方需持有 _render_lock）"""
+        if self._chart is None:
+            self._chart = PieChartFigure(self.font_family)
+            self._canvas = FigureCanvasAgg(self._chart.figure)
+        return self._chart.update(data_dict, title)
+
+    def invalidate_cache(self):
+        """数据被修改后清空渲染缓存"""
+        self.cache.invalidate()
+
+    def cache_stats(self):
+        """渲染缓存统计"""
+        return self.cache.stats()
+
+    def create_pie_chart(self, data_dict, title="精力分配"):
+        """创建饼图 - 固定饼图尺寸，根据图例数量动态调整总高度（每次返回新的 Figure）"""
+        if not data_dict:
+            return None
+
+        if sum(data_dict.values()) == 0:
+            return None
+
+        return PieChartFigure(self.font_family).update(data_dict, title)
+
+
+if __name__ == '__main__':
+    # python -m core.chart_generator：打印首次绘图的耗时分解
+    t0 = time.perf_counter()
+    generator = ChartGenerator()
+    generator.render_pie_chart({'工作': 6.0, '学习': 2.5, '运动': 1.0}, "示例 精力分配")
+    total = time.perf_counter() - t0
+    for phase, seconds in load_times().items():
+        print(f"{phase:<28}{seconds * 1000:8.1f} ms")
+    print(f"{'首次绘图合计':<28}{total * 1000:8.1f} ms")
@@ -1,14 +1,24 @@
 # -*- coding: utf-8 -*-
 """
-数据管理器 - JSON 格式（数据存放在应用内部）
+数据管理器 - JSON / SQLite 存储（数据存放在应用内部）
 """
 
 import os
 import sys
-import json
 import uuid
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 
+from core.date_keys import date_key_to_ordinal, to_ordinal, ordinal_to_key, ordinal_rows
+from core.rollup_index import RollupIndex
+from core.day_matrix import DayMatrix
+from core.task_index import TaskIndex
+from core.storage import (Storage, JsonStorage, LazyEnergyData, ENERGY, TASKS, CATEGORIES,
+                          find_data_file, strip_codec_suffix)
+
 
 def get_app_data_dir():
     """获取应用数据目录"""
@@ -27,103 +37,568 @@ def get_app_data_dir():
     return app_data
 
 
+# 任务变化事件的类型
+TASK_INSERTED = 'inserted'
+TASK_REMOVED = 'removed'
+TASK_UPDATED = 'updated'
+TASK_MOVED = 'moved'
+TASK_RESET = 'reset'        # 任务列表被整体改写，监听器应全部重新读取
+
+# 任务变化事件：row 为任务在 quadrant 中的行号（删除时为删除前的行号）；
+# moved 事件的 old_quadrant / old_row 为移动前的位置，象限内调整顺序时 old_quadrant == quadrant
+TaskEvent = namedtuple('TaskEvent', 'kind task_id task quadrant row old_quadrant old_row',
+                       defaults=(None,) * 6)
+
+# 事务内的任务事件超过该数量时，提交后只发送一个 TASK_RESET
+TRANSACTION_EVENT_LIMIT = 50
+
+
 class DataManager:
-    def __init__(self, data_file=None):
-        if data_file is None:
+    def __init__(self, data_file=None, backend='json', commit_window=0.0,
+                 write_behind_ms=None, data_dir=None, compression=None, read_only=False):
+        """backend: 'json'（默认）、'journal'、'sqlite'、'sharded'（精力数据按年分片）、
+        'binary'（精力数据为内存映射的二进制快照），或直接传入 Storage 实例
+
+        data_dir: 数据目录（精力数据与配置文件所在目录），默认为应用数据目录。
+        compression: 新建数据文件时使用的压缩格式（None、'gzip'、'xz'、'lzma'）；
+        已存在的 xxx.json / xxx.json.gz / xxx.json.xz 等文件总是按原格式读写。
+
+        commit_window: 组提交窗口（秒），> 0 时窗口内的多次修改合并为一次写入和 fsync，
+        仅对 JSON / 日志存储有效。
+        write_behind_ms: 延迟写入，修改只更新内存，空闲该毫秒数后在后台线程落盘；
+        None 表示每次修改同步写入。
+        read_only: 只读取数据（报表等工具），不创建数据目录和缺少的配置文件。
+        """
+        if data_dir is None:
             data_dir = get_app_data_dir()
-            data_file = os.path.join(data_dir, 'energy_data.json')
+        if data_file is None:
+            data_file = find_data_file(os.path.join(data_dir, 'energy_data.json'), compression)
         
         self.data_file = data_file
-        self._ensure_data_file()
-        
+
         # 配置文件路径
-        self.config_dir = get_app_data_dir()
-        self.categories_file = os.path.join(self.config_dir, 'categories_config.json')
-        self.quadrant_file = os.path.join(self.config_dir, 'quadrant_tasks.json')
-        
-        # 初始化配置文件（如果不存在）
-        self._ensure_config_files()
+        self.config_dir = data_dir
+        self.categories_file = find_data_file(
+            os.path.join(self.config_dir, 'categories_config.json'), compression)
+        self.quadrant_file = find_data_file(
+            os.path.join(self.config_dir, 'quadrant_tasks.json'), compression)
+
+        # 日期索引：按序数排序的 (ordinals, keys)，对应某个精力数据对象
+        self._date_index = None
+        self._date_index_source = None
+
+        # 分类前缀和索引，保存/删除单日时增量更新
+        self._rollup = None
+        self._rollup_source = None
+
+        # 列式分类矩阵（可选），首次调用 get_day_matrix 时构建，之后随单日修改同步
+        self._day_matrix = None
+        self._day_matrix_source = None
+
+        # 任务索引：id -> 任务、象限 -> 有序 id 列表，对应某个任务数据对象
+        self._task_index = None
+        self._task_index_source = None
+        self._task_listeners = []
+
+        # 延迟写入：修改内存数据时持有 _lock；后台落盘只在持锁时复制出脏文档，
+        # 写文件和 fsync 在锁外进行，界面线程的修改不会等待磁盘 I/O
+        self._lock = threading.RLock()
+        self._flush_done = threading.Condition(self._lock)
+        self.write_behind_ms = write_behind_ms
+        self._dirty = {}            # name -> (文档, 合并后的 changes，None 表示整体写入)
+        self._flushing = {}         # 后台线程正在写入的脏文档，同 _dirty
+        self._flush_timer = None
+        self.flush_errors = 0
+
+        # 事务：进行中时修改只在内存中合并，结束时统一提交
+        self._transaction = None            # name -> (文档, 合并后的 changes)
+        self._transaction_owner = None      # 开启事务的线程
+        self._transaction_events = []       # 事务内的任务事件，提交后再通知监听器
+        self._transaction_tasks = False     # 事务内是否读取过任务（可能已被就地修改）
+
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+        self.storage = self._create_storage(backend, commit_window)
+
+        # 初始化数据文件（如果不存在）
+        if not read_only:
+            self._ensure_data_file()
+            self._ensure_config_files()
+
+    def _json_paths(self):
+        return {
+            ENERGY: self.data_file,
+            TASKS: self.quadrant_file,
+            CATEGORIES: self.categories_file,
+        }
+
+    def _create_storage(self, backend, commit_window):
+        """创建存储后端"""
+        if isinstance(backend, Storage):
+            return backend
+        if backend == 'json':
+            return JsonStorage(self._json_paths(), commit_window=commit_window)
+        if backend == 'journal':
+            from core.journal_storage import JournalStorage
+
+            return JournalStorage(self._json_paths(), commit_window=commit_window)
+        if backend == 'sqlite':
+            from core.sqlite_storage import SqliteStorage, migrate_json_to_sqlite
+
+            db_path = os.path.splitext(strip_codec_suffix(self.data_file))[0] + '.db'
+            if not os.path.exists(db_path):
+                # 首次启用 SQLite 时从现有 JSON 文件迁移
+                migrate_json_to_sqlite(self._json_paths(), db_path)
+            return SqliteStorage(db_path)
+        if backend == 'binary':
+            from core.binary_snapshot import BinarySnapshotStorage, json_to_snapshot
+
+            snapshot_path = os.path.splitext(strip_codec_suffix(self.data_file))[0] + '.bin'
+            if not os.path.exists(snapshot_path) and os.path.exists(self.data_file):
+                # 首次启用快照时从现有 JSON 文件转换
+                json_to_snapshot(self.data_file, snapshot_path)
+            return BinarySnapshotStorage(self._json_paths(), snapshot_path, commit_window=commit_window)
+        if backend == 'sharded':
+            from core.sharded_storage import ShardedJsonStorage, SHARD_DIR_NAME, migrate_json_to_shards
+
+            shard_dir = os.path.join(os.path.dirname(self.data_file), SHARD_DIR_NAME)
+            if not os.path.isdir(shard_dir) and os.path.exists(self.data_file):
+                # 首次启用分片时拆分现有的单个 JSON 文件
+                migrate_json_to_shards(self._json_paths(), shard_dir)
+            return ShardedJsonStorage(self._json_paths(), shard_dir, commit_window=commit_window)
+        raise ValueError(f"未知的存储后端: {backend}")
 
     def _ensure_data_file(self):
         """确保数据文件存在"""
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
+        if not self.storage.exists(ENERGY):
+            self.storage.write(ENERGY, {})
 
     def _ensure_config_files(self):
         """确保配置文件存在（首次运行自动创建）"""
-        # 1. 确保 categories_config.json 存在
-        if not os.path.exists(self.categories_file):
-            default_categories = {
-                'categories': [
-                    "晚觉", "午觉", "生活日常", "通勤",
-                    "无聊刷视频", "玩游戏", "Token", "吃饭休息",
-                    "健身", "工作", "副业", "思考规划"
-                ]
-            }
-            with open(self.categories_file, 'w', encoding='utf-8') as f:
-                json.dump(default_categories, f, ensure_ascii=False, indent=2)
-        
-        # 2. 确保 quadrant_tasks.json 存在
-        if not os.path.exists(self.quadrant_file):
-            default_tasks = {'tasks': []}
-            with open(self.quadrant_file, 'w', encoding='utf-8') as f:
-                json.dump(default_tasks, f, ensure_ascii=False, indent=2)
+        # 1. 确保分类配置存在
+        if not self.storage.exists(CATEGORIES):
+            self.storage.write(CATEGORIES, {'categories': self._default_categories()})
+
+        # 2. 确保四象限任务存在
+        if not self.storage.exists(TASKS):
+            self.storage.write(TASKS, {'tasks': []})
+
+    def flush(self):
+        """立即把延迟写入的修改和存储层排队的修改落盘"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._wait_for_flush()
+            self._flush_dirty()
+        self.storage.flush()
+
+    def has_pending_writes(self):
+        """是否还有未落盘的延迟写入"""
+        with self._lock:
+            return bool(self._dirty or self._flushing)
+
+    def commit_stats(self):
+        """提交统计：次数、被合并的写入数、提交耗时（毫秒）"""
+        stats = self.storage.commit_stats()
+        stats['flush_errors'] = self.flush_errors
+        return stats
+
+    def close(self):
+        """落盘所有修改并关闭存储后端（等待后台写入完成）"""
+        self.flush()
+        self.storage.close()
+
+    # ==================== 存储 ====================
+
+    def _read_doc(self, name, default):
+        """读取文档，不存在时返回 default() 生成的默认值
+
+        有未落盘的修改时直接返回内存中的文档，不会被磁盘上的旧内容覆盖。
+        """
+        dirty = self._dirty.get(name) or self._flushing.get(name)
+        if dirty is not None:
+            return dirty[0]
+        doc = self.storage.read(name)
+        return default() if doc is None else doc
+
+    @staticmethod
+    def _merge_write(pending, name, doc, changes):
+        """把一次修改合并到 pending（name -> (文档, changes)），任一次为整体写入则合并后也是整体写入"""
+        if name in pending:
+            merged = pending[name][1]
+            if merged is None or changes is None:
+                changes = None
+            else:
+                merged.update(changes)
+                changes = merged
+        else:
+            changes = None if changes is None else dict(changes)
+        pending[name] = (doc, changes)
+
+    def _persist(self, name, doc, changes=None):
+        """持久化文档：同步写入，或在延迟写入模式下记为脏数据并重置空闲计时器
+
+        事务进行中时只合并到事务，由 transaction() 结束时统一写入。
+        """
+        if self._transaction is not None:
+            self._merge_write(self._transaction, name, doc, changes)
+            return
+
+        if self.write_behind_ms is None:
+            self.storage.write(name, doc, changes)
+            return
+
+        with self._lock:
+            self._merge_write(self._dirty, name, doc, changes)
+
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(self.write_behind_ms / 1000, self._flush_in_background)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._flush_timer = None
+            self._wait_for_flush()
+            if not self._dirty:
+                return
+            flushing = self._dirty
+            frozen = {name: self.storage.freeze(name, doc, changes)
+                      for name, (doc, changes) in flushing.items()}
+            self._flushing, self._dirty = flushing, {}
+
+        failed = {}
+        for name, (doc, changes) in flushing.items():
+            try:
+                self.storage.write(name, doc, changes, frozen[name])
+            except Exception:
+                failed[name] = (doc, changes)
+
+        with self._lock:
+            if failed:
+                # 未写成功的文档仍保留为脏数据（并入之后的修改），下次修改或 flush() 时重试
+                self.flush_errors += 1
+                for name, (doc, changes) in failed.items():
+                    pending = {name: (doc, changes)}
+                    if name in self._dirty:
+                        self._merge_write(pending, name, *self._dirty[name])
+                    self._dirty[name] = pending[name]
+            self._flushing = {}
+            self._flush_done.notify_all()
+
+    def _wait_for_flush(self):
+        """等待后台线程写完正在写入的文档（调用方持有 _lock，等待期间释放）"""
+        while self._flushing:
+            self._flush_done.wait()
+
+    def _flush_dirty(self):
+        """把脏文档写入存储（调用方持有 _lock）"""
+        while self._dirty:
+            name, (doc, changes) = next(iter(self._dirty.items()))
+            self.storage.write(name, doc, changes)
+            del self._dirty[name]
+
+    # ==================== 事务 ====================
+
+    @contextmanager
+    def transaction(self):
+        """事务：with 块内的修改只在内存中进行，正常结束时每个文档只写入一次
+
+            with data_manager.transaction():
+                data_manager.save_day_data('2025.03.01', {...})
+                data_manager.delete_day_data('2025.03.02')
+
+        块内抛出异常时回滚：丢弃内存中的修改并重新读取事务开始前的数据，异常继续向外抛出；
+        提交失败同样回滚并抛出。事务内的任务事件在提交后才通知监听器；回滚时丢弃这些事件，
+        事务内访问过任务的话改为通知一次 TASK_RESET（视图持有的任务可能已被就地修改）。
+        嵌套时内层并入最外层事务。事务期间持有写锁，其他线程的修改等待事务结束。
+        每个文档总是整体原子写入；多个文档在一次提交中一起生效仅 SQLite 后端保证。
+        """
+        with self._lock:
+            if self._transaction is not None:
+                yield
+                return
+
+            # 先落盘之前的修改，回滚时重新读取到的就是事务开始前的状态
+            self.flush()
+            self._transaction = {}
+            self._transaction_owner = threading.get_ident()
+            self._transaction_events = []
+            try:
+                yield
+                writes, events = self._transaction, self._transaction_events
+                self._end_transaction()
+                self._commit_writes(writes)
+            except BaseException:
+                tasks_touched = self._transaction_tasks
+                self._end_transaction()
+                self._rollback()
+                if tasks_touched:
+                    self._notify_task_listeners(TaskEvent(TASK_RESET))
+                raise
+
+        if len(events) > TRANSACTION_EVENT_LIMIT:
+            events = [TaskEvent(TASK_RESET)]
+        for event in events:
+            self._notify_task_listeners(event)
+
+    def in_transaction(self):
+        """当前线程是否处于事务中"""
+        return self._transaction is not None and self._transaction_owner == threading.get_ident()
+
+    def _end_transaction(self):
+        self._transaction = None
+        self._transaction_owner = None
+        self._transaction_events = []
+        self._transaction_tasks = False
+
+    def _commit_writes(self, writes):
+        """提交事务中合并好的修改（每个文档一次）"""
+        items = [(name, doc, changes) for name, (doc, changes) in writes.items()]
+        if self.write_behind_ms is None:
+            self.storage.write_many(items)
+        else:
+            for name, doc, changes in items:
+                self._persist(name, doc, changes)
+
+    def _rollback(self):
+        """丢弃内存中未提交的修改，下次访问时从存储层重新读取"""
+        self.invalidate_cache()
+        self._task_index = None
+
+    def _load_energy_data(self):
+        """加载全部精力数据（缓存）"""
+        return self._read_doc(ENERGY, dict)
+
+    def cache_stats(self):
+        """缓存命中统计"""
+        return self.storage.cache_stats()
+
+    def invalidate_cache(self):
+        """清空缓存，下次访问时重新读取磁盘"""
+        self.storage.invalidate()
+        self._date_index = None
+        self._rollup = None
+        self._day_matrix = None
+
+    # ==================== 日期索引 ====================
+
+    def _get_date_index(self, all_data):
+        """获取按日期排序的索引 (ordinals, keys)
+
+        all_data 被重新加载（对象变化）或索引被置空时重建。
+        """
+        if self._date_index is None or self._date_index_source is not all_data:
+            pairs = []
+            for key in all_data:
+                try:
+                    pairs.append((date_key_to_ordinal(key), key))
+                except ValueError:
+                    continue
+            pairs.sort()
+            self._date_index = ([p[0] for p in pairs], [p[1] for p in pairs])
+            self._date_index_source = all_data
+        return self._date_index
+
+    def _update_date_index(self, all_data, date_str, present):
+        """单日新增/删除时增量维护日期索引（索引尚未构建则跳过）"""
+        if self._date_index is None or self._date_index_source is not all_data:
+            return
+        try:
+            ordinal = date_key_to_ordinal(date_str)
+        except ValueError:
+            return
+
+        ordinals, keys = self._date_index
+        i = bisect_left(ordinals, ordinal)
+        exists = i < len(ordinals) and keys[i] == date_str
+        if present and not exists:
+            ordinals.insert(i, ordinal)
+            keys.insert(i, date_str)
+        elif not present and exists:
+            del ordinals[i]
+            del keys[i]
+
+    def _date_slice(self, ordinals, start, end):
+        """二分查找 [start, end] 在索引中的下标范围，None 表示不限"""
+        lo = 0 if start is None else bisect_left(ordinals, to_ordinal(start))
+        hi = len(ordinals) if end is None else bisect_right(ordinals, to_ordinal(end))
+        return lo, max(lo, hi)
+
+    def _day_rows(self, all_data):
+        """{date_str: 数据} -> {日序数: 数据}，用于构建前缀和索引与分类矩阵"""
+        return ordinal_rows(all_data)
+
+    def _get_rollup(self, all_data):
+        """获取分类前缀和索引，all_data 被重新加载时重建"""
+        if self._rollup is None or self._rollup_source is not all_data:
+            self._rollup = RollupIndex.build(self._day_rows(all_data))
+            self._rollup_source = all_data
+        return self._rollup
+
+    def _update_rollup(self, all_data, date_str, row):
+        """单日变更时增量更新前缀和索引（索引尚未构建则跳过）"""
+        if self._rollup is not None and self._rollup_source is all_data:
+            try:
+                self._rollup.set_day(date_key_to_ordinal(date_str), row)
+            except ValueError:
+                pass
+
+    def _update_day_matrix(self, all_data, date_str, row):
+        """单日变更时同步分类矩阵（矩阵尚未构建则跳过）"""
+        if self._day_matrix is not None and self._day_matrix_source is all_data:
+            try:
+                self._day_matrix.set_day(date_key_to_ordinal(date_str), row)
+            except ValueError:
+                pass
+
+    def get_day_matrix(self):
+        """获取天 × 分类的列式矩阵（DayMatrix），用于周/月/年汇总、平均与趋势分析
+
+        首次调用时由全部精力数据构建，数据被重新加载时重建；
+        返回的对象会随 save_day_data / delete_day_data 同步更新，调用方不要修改它。
+        """
+        with self._lock:
+            all_data = self._load_energy_data()
+            if self._day_matrix is None or self._day_matrix_source is not all_data:
+                self._day_matrix = DayMatrix.build(self._day_rows(all_data))
+                self._day_matrix_source = all_data
+            return self._day_matrix
 
     # ==================== 精力数据管理 ====================
 
+    def _set_day(self, all_data, date_str, data_dict):
+        """修改内存中某天的数据并同步各索引"""
+        all_data[date_str] = data_dict
+        self._update_date_index(all_data, date_str, True)
+        self._update_rollup(all_data, date_str, data_dict)
+        self._update_day_matrix(all_data, date_str, data_dict)
+
+    def _remove_day(self, all_data, date_str):
+        """删除内存中某天的数据并同步各索引"""
+        if date_str in all_data:
+            del all_data[date_str]
+            self._update_date_index(all_data, date_str, False)
+            self._update_rollup(all_data, date_str, {})
+            self._update_day_matrix(all_data, date_str, {})
+
     def save_day_data(self, date_str, data_dict):
         """保存某天的数据"""
+        with self._lock:
+            try:
+                all_data = self._load_energy_data()
+                self._set_day(all_data, date_str, data_dict)
+                self._persist(ENERGY, all_data, {date_str: data_dict})
+                return True
+            except Exception:
+                return False
+
+    def save_days(self, days):
+        """批量保存多天的数据 {date_str: data_dict}，只提交一次；失败时全部回滚
+
+        在外层事务中调用时不会单独回滚，失败直接抛出异常，由外层事务整体回滚。
+        """
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_data = json.load(f)
-
-            all_data[date_str] = data_dict
-
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, ensure_ascii=False, indent=2)
-
+            with self.transaction():
+                all_data = self._load_energy_data()
+                for date_str, data_dict in days.items():
+                    self._set_day(all_data, date_str, data_dict)
+                self._persist(ENERGY, all_data, dict(days))
             return True
         except Exception:
+            if self.in_transaction():
+                raise
             return False
 
     def get_day_data(self, date_str):
         """获取某天的数据"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_data = json.load(f)
-
-            return all_data.get(date_str, None)
+            day_data = self._load_energy_data().get(date_str, None)
+            return dict(day_data) if day_data is not None else None
         except Exception:
             return None
 
     def delete_day_data(self, date_str):
         """删除某天的数据"""
+        with self._lock:
+            try:
+                all_data = self._load_energy_data()
+                self._remove_day(all_data, date_str)
+                self._persist(ENERGY, all_data, {date_str: None})
+                return True
+            except Exception:
+                return False
+
+    def delete_days(self, date_strs):
+        """批量删除多天的数据，只提交一次；失败时全部回滚（在外层事务中调用时抛出异常，同 save_days）"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_data = json.load(f)
-
-            if date_str in all_data:
-                del all_data[date_str]
-
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, ensure_ascii=False, indent=2)
-
+            with self.transaction():
+                all_data = self._load_energy_data()
+                changes = {}
+                for date_str in date_strs:
+                    self._remove_day(all_data, date_str)
+                    changes[date_str] = None
+                self._persist(ENERGY, all_data, changes)
             return True
         except Exception:
+            if self.in_transaction():
+                raise
             return False
 
     def get_date_range_data(self, start_date, end_date):
-        """获取日期范围内的数据"""
+        """获取日期范围内的数据（闭区间，按日期升序）
+
+        start_date / end_date 可以是 date、datetime 或 'YYYY.MM.DD' 字符串，
+        传 None 表示该端不限。
+        """
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                all_data = json.load(f)
+            return dict(self.iter_date_range(start_date, end_date))
+        except Exception:
+            return {}
 
-            result = {}
-            for date_key in all_data:
-                result[date_key] = all_data[date_key]
-            return result
+    def iter_date_range(self, start_date, end_date):
+        """惰性遍历日期范围内的数据，逐个产出 (date_str, data_dict)
+
+        只在遍历时按需取出每天的数据，适合流式处理多年的历史记录。
+        """
+        all_data = self._load_energy_data()
+        if isinstance(all_data, LazyEnergyData):
+            # 分片 / 快照存储只读取区间涉及的数据
+            start = None if start_date is None else to_ordinal(start_date)
+            end = None if end_date is None else to_ordinal(end_date)
+            yield from all_data.range_items(start, end)
+            return
+
+        ordinals, keys = self._get_date_index(all_data)
+        lo, hi = self._date_slice(ordinals, start_date, end_date)
+        for i in range(lo, hi):
+            key = keys[i]
+            yield key, dict(all_data[key])
+
+    def aggregate_range(self, start, end):
+        """汇总 [start, end] 闭区间内各分类的分钟数
+
+        start / end 可以是 date、datetime 或 'YYYY.MM.DD' 字符串。
+        基于前缀和索引，任意区间只需两次查表；结果按分类在区间内第一次出现的日期排序，
+        与逐日累加的顺序相同（每个分类再做一次二分查找）。
+        """
+        try:
+            start, end = to_ordinal(start), to_ordinal(end)
+            all_data = self._load_energy_data()
+            if isinstance(all_data, LazyEnergyData):
+                return all_data.aggregate(start, end)
+            pending = (ENERGY in self._dirty or ENERGY in self._flushing
+                       or (self._transaction is not None and ENERGY in self._transaction))
+            if not pending:
+                # 存储层数据是最新的（没有延迟写入或事务中未提交的修改）才交给它汇总
+                totals = self.storage.aggregate_range(start, end)
+                if totals is not None:
+                    return totals
+            return self._get_rollup(all_data).aggregate(
+                start, end, lambda ordinal: all_data.get(ordinal_to_key(ordinal)))
         except Exception:
             return {}
 
@@ -132,11 +607,9 @@ class DataManager:
     def load_categories(self):
         """加载分类列表"""
         try:
-            if os.path.exists(self.categories_file):
-                with open(self.categories_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('categories', self._default_categories())
-            return self._default_categories()
+            data = self._read_doc(CATEGORIES, dict)
+            # 返回副本，调用方会直接修改列表后再 save_categories
+            return list(data.get('categories', self._default_categories()))
         except:
             return self._default_categories()
 
@@ -150,53 +623,126 @@ class DataManager:
 
     def save_categories(self, categories):
         """保存分类配置"""
-        try:
-            with open(self.categories_file, 'w', encoding='utf-8') as f:
-                json.dump({'categories': categories}, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception:
-            return False
+        with self._lock:
+            try:
+                self._persist(CATEGORIES, {'categories': list(categories)})
+                return True
+            except Exception:
+                return False
 
     # ==================== 四象限任务管理 ====================
 
+    def add_task_listener(self, callback):
+        """注册任务变化监听器，callback(event) 在修改任务的线程中调用，event 为 TaskEvent"""
+        self._task_listeners.append(callback)
+
+    def remove_task_listener(self, callback):
+        """取消注册任务变化监听器"""
+        if callback in self._task_listeners:
+            self._task_listeners.remove(callback)
+
+    def _notify_task_listeners(self, event):
+        if self.in_transaction():
+            self._transaction_events.append(event)
+            return
+        for callback in list(self._task_listeners):
+            callback(event)
+
     def _load_quadrant_tasks(self):
         """加载四象限任务"""
+        if self.in_transaction():
+            self._transaction_tasks = True
         try:
-            if os.path.exists(self.quadrant_file):
-                with open(self.quadrant_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {'tasks': []}
+            return self._read_doc(TASKS, lambda: {'tasks': []})
         except Exception:
             return {'tasks': []}
 
-    def _save_quadrant_tasks(self, data):
-        """保存四象限任务"""
-        try:
-            with open(self.quadrant_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception:
-            return False
+    def _get_task_index(self, data):
+        """获取任务索引，任务数据被重新加载时重建
+
+        旧数据中没有 rank 的任务在重建时补上排序键，并作为增量写回（只发生一次）。
+        """
+        with self._lock:
+            if self._task_index is None or self._task_index_source is not data:
+                index = TaskIndex(data['tasks'])
+                self._task_index = index
+                self._task_index_source = data
+                if index.assigned:
+                    self._persist(TASKS, data, {task['id']: task for task in index.assigned})
+            return self._task_index
+
+    def _save_quadrant_tasks(self, data, changes=None):
+        """保存四象限任务，changes 为 {task_id: task 或 None} 的增量提示
+
+        不带 changes 时视为任务列表被整体改写，索引随之重建，并通知监听器全部刷新。
+        """
+        with self._lock:
+            try:
+                if changes is None:
+                    self._task_index = None
+                self._persist(TASKS, data, changes)
+                saved = True
+            except Exception:
+                saved = False
+            if changes is None:
+                self._notify_task_listeners(TaskEvent(TASK_RESET))
+            return saved
+
+    def _new_task(self, data, index, text, quadrant):
+        """新建任务并加入任务列表和索引，返回 (任务, 插入事件)"""
+        task_id = str(uuid.uuid4())
+
+        task = {
+            'id': task_id,
+            'text': text,
+            'quadrant': quadrant,
+            'completed': False,
+            'created_at': datetime.now().isoformat()
+        }
+
+        index.append(task)
+        return task, TaskEvent(TASK_INSERTED, task_id, task, quadrant, index.position(task_id))
 
     def add_task(self, text, quadrant):
         """添加任务"""
+        with self._lock:
+            try:
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                task, event = self._new_task(data, index, text, quadrant)
+                self._save_quadrant_tasks(data, {task['id']: task})
+            except Exception:
+                return None
+
+            self._notify_task_listeners(event)
+            return task['id']
+
+    def add_tasks(self, tasks):
+        """批量添加任务 [(text, quadrant), ...]，只提交一次
+
+        返回新任务的 id 列表，失败时全部回滚并返回 None（在外层事务中调用时抛出异常，同 save_days）。
+        """
         try:
-            data = self._load_quadrant_tasks()
-
-            task_id = str(uuid.uuid4())
-
-            task = {
-                'id': task_id,
-                'text': text,
-                'quadrant': quadrant,
-                'completed': False,
-                'created_at': datetime.now().isoformat()
-            }
-
-            data['tasks'].append(task)
-            self._save_quadrant_tasks(data)
+            with self.transaction():
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                changes = {}
+                for text, quadrant in tasks:
+                    task, event = self._new_task(data, index, text, quadrant)
+                    changes[task['id']] = task
+                    self._notify_task_listeners(event)
+                self._save_quadrant_tasks(data, changes)
+            return list(changes)
+        except Exception:
+            if self.in_transaction():
+                raise
+            return None
 
-            return task_id
+    def get_task(self, task_id):
+        """按 id 获取任务，不存在返回 None"""
+        try:
+            data = self._load_quadrant_tasks()
+            return self._get_task_index(data).get(task_id)
         except Exception:
             return None
 
@@ -204,45 +750,133 @@ class DataManager:
         """获取象限任务"""
         try:
             data = self._load_quadrant_tasks()
-            tasks = [t for t in data['tasks'] if t.get('quadrant') == quadrant]
-            return tasks
+            return self._get_task_index(data).tasks_in(quadrant)
         except Exception:
             return []
 
     def delete_task(self, task_id):
         """删除任务"""
-        try:
-            data = self._load_quadrant_tasks()
-            data['tasks'] = [t for t in data['tasks'] if t['id'] != task_id]
-            self._save_quadrant_tasks(data)
+        with self._lock:
+            try:
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                event = None
+                row = index.position(task_id)
+                task = index.pop(task_id)
+                if task is not None:
+                    event = TaskEvent(TASK_REMOVED, task_id, task, task.get('quadrant'), row)
+                self._save_quadrant_tasks(data, {task_id: None})
+            except Exception:
+                return False
+
+            if event is not None:
+                self._notify_task_listeners(event)
             return True
-        except Exception:
-            return False
 
     def move_task(self, task_id, new_quadrant):
         """移动任务到其他象限"""
-        try:
-            data = self._load_quadrant_tasks()
-            for task in data['tasks']:
-                if task['id'] == task_id:
+        with self._lock:
+            try:
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                changes = {}
+                event = None
+                task = index.get(task_id)
+                if task is not None:
+                    old_quadrant = task.get('quadrant')
+                    old_row = index.position(task_id)
                     task['quadrant'] = new_quadrant
-                    break
-            self._save_quadrant_tasks(data)
+                    index.move(task_id, old_quadrant)
+                    changes[task_id] = task
+                    event = TaskEvent(TASK_MOVED, task_id, task, new_quadrant,
+                                      index.position(task_id), old_quadrant, old_row)
+                self._save_quadrant_tasks(data, changes)
+            except Exception:
+                return False
+
+            if event is not None:
+                self._notify_task_listeners(event)
+            return True
+
+    def reorder_task(self, task_id, before_id=None, after_id=None):
+        """在象限内调整任务顺序：放到 before_id 之后 / after_id 之前
+
+        只改写被移动任务的排序键，存储层按单条任务增量保存。
+        """
+        with self._lock:
+            try:
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                if task_id not in index:
+                    return False
+                old_row = index.position(task_id)
+                task = index.reorder(task_id, before_id, after_id)
+                self._save_quadrant_tasks(data, {task_id: task})
+                quadrant = task.get('quadrant')
+                event = TaskEvent(TASK_MOVED, task_id, task, quadrant,
+                                  index.position(task_id), quadrant, old_row)
+            except Exception:
+                return False
+
+            self._notify_task_listeners(event)
             return True
-        except Exception:
-            return False
 
     def toggle_task_completed(self, task_id):
         """切换任务完成状态"""
-        try:
-            data = self._load_quadrant_tasks()
-
-            for task in data['tasks']:
-                if task['id'] == task_id:
+        with self._lock:
+            try:
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+
+                changes = {}
+                event = None
+                task = index.get(task_id)
+                if task is not None:
                     task['completed'] = not task.get('completed', False)
-                    break
+                    changes[task_id] = task
+                    event = TaskEvent(TASK_UPDATED, task_id, task, task.get('quadrant'),
+                                      index.position(task_id))
 
-            self._save_quadrant_tasks(data)
+                self._save_quadrant_tasks(data, changes)
+            except Exception:
+                return False
+
+            if event is not None:
+                self._notify_task_listeners(event)
+            return True
+
+    def update_tasks(self, updates):
+        """批量修改任务 [{'id': task_id, 字段: 新值, ...}, ...]，只提交一次
+
+        修改 quadrant 时任务移到新象限末尾（同 move_task）；id 与 rank 不可修改，
+        不存在的任务跳过。失败时全部回滚并返回 False（在外层事务中调用时抛出异常，同 save_days）。
+        """
+        try:
+            with self.transaction():
+                data = self._load_quadrant_tasks()
+                index = self._get_task_index(data)
+                changes = {}
+                for update in updates:
+                    task_id = update['id']
+                    task = index.get(task_id)
+                    if task is None:
+                        continue
+                    old_quadrant = task.get('quadrant')
+                    old_row = index.position(task_id)
+                    task.update((key, value) for key, value in update.items()
+                                if key not in ('id', 'rank'))
+                    quadrant = task.get('quadrant')
+                    if quadrant != old_quadrant:
+                        index.move(task_id, old_quadrant)
+                        event = TaskEvent(TASK_MOVED, task_id, task, quadrant,
+                                          index.position(task_id), old_quadrant, old_row)
+                    else:
+                        event = TaskEvent(TASK_UPDATED, task_id, task, quadrant, old_row)
+                    changes[task_id] = task
+                    self._notify_task_listeners(event)
+                self._save_quadrant_tasks(data, changes)
             return True
         except Exception:
+            if self.in_transaction():
+                raise
             return False
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+日期键 - 精力数据的键 'YYYY.MM.DD' 与公历序数（date.toordinal）互转（数据管理与各存储后端共用）
+"""
+
+from datetime import date, datetime
+
+
+def date_key_to_ordinal(date_str):
+    """'YYYY.MM.DD' -> 公历序数，格式不对时抛出 ValueError"""
+    return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])).toordinal()
+
+
+def key_ordinal(date_str):
+    """'YYYY.MM.DD' -> 公历序数，不是日期的键返回 None"""
+    try:
+        return date_key_to_ordinal(date_str)
+    except (ValueError, TypeError):
+        return None
+
+
+def to_ordinal(value):
+    """将 date / datetime / 'YYYY.MM.DD' 字符串统一转换为公历序数"""
+    if isinstance(value, str):
+        return date_key_to_ordinal(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def to_date(value):
+    """将 date / datetime / 'YYYY.MM.DD' 字符串统一转换为 date"""
+    return date.fromordinal(to_ordinal(value))
+
+
+def ordinal_to_key(ordinal):
+    """公历序数 -> 'YYYY.MM.DD'"""
+    return date.fromordinal(ordinal).strftime('%Y.%m.%d')
+
+
+def ordinal_rows(energy_data):
+    """{date_str: {分类: 分钟}} -> {日序数: {分类: 分钟}}，跳过不是日期的键"""
+    day_rows = {}
+    for key, row in energy_data.items():
+        ordinal = key_ordinal(key)
+        if ordinal is not None:
+            day_rows[ordinal] = row
+    return day_rows
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+按天 × 分类的数组 - RollupIndex（前缀和）与 DayMatrix（每日分钟数）共用的分类列分配与按天扩容
+"""
+
+import numpy as np
+
+
+# 扩容时一次性多预留的天数，避免逐日追加时反复复制数组
+GROW_DAYS = 366
+
+
+def first_seen_order(first_days, row_of=None):
+    """{分类: 区间内第一次有分钟数的日序数} -> 按该日期排序的分类列表
+
+    与按日期逐日累加得到的字典顺序相同：同一天第一次出现的分类按 row_of(日序数)
+    返回的当天数据中的键顺序排列；没有 row_of 或当天数据中找不到时保持 first_days 中的顺序。
+    """
+    day_orders = {}
+
+    def sort_key(category):
+        ordinal = first_days[category]
+        order = day_orders.get(ordinal)
+        if order is None:
+            row = row_of(ordinal) if row_of is not None else None
+            order = day_orders[ordinal] = {key: i for i, key in enumerate(row or ())}
+        return ordinal, order.get(category, len(order))
+
+    return sorted(first_days, key=sort_key)
+
+
+class DayColumns:
+    """行按日序数排列、列为分类的 numpy 数组（_array）
+
+    分类名在首次出现时分配列序号（categories[c]），之后保持不变。
+    子类定义 num_days（_array 中对应日子的行数）；扩容时新增的行默认补 0，
+    需要其他内容时重写 _new_rows。
+    """
+
+    def __init__(self, array):
+        self.origin = None                      # 第 0 天对应的日序数
+        self.categories = []                    # 列序号 -> 分类名
+        self._category_ids = {}                 # 分类名 -> 列序号
+        self._array = array
+
+    @property
+    def num_days(self):
+        raise NotImplementedError
+
+    def _category_id(self, category):
+        """获取分类列序号，新分类追加一列"""
+        cid = self._category_ids.get(category)
+        if cid is None:
+            cid = len(self.categories)
+            self.categories.append(category)
+            self._category_ids[category] = cid
+            if self._array.shape[1] < len(self.categories):
+                extra = np.zeros((self._array.shape[0], 1), dtype=self._array.dtype)
+                self._array = np.hstack([self._array, extra])
+        return cid
+
+    def _row_vector(self, row):
+        vector = np.zeros(len(self.categories), dtype=np.int64)
+        for category, minutes in row.items():
+            vector[self._category_ids[category]] = int(minutes)
+        return vector
+
+    def _daily_rows(self, day_rows):
+        """登记 {日序数: {分类: 分钟}} 中的分类，返回 (首日序数, int64 矩阵[天, 分类])
+
+        分类按日期顺序第一次出现的先后分配列序号（与文件中的键顺序无关）。
+        """
+        for ordinal in sorted(day_rows):
+            for category in day_rows[ordinal]:
+                self._category_id(category)
+        first, last = min(day_rows), max(day_rows)
+        daily = np.zeros((last - first + 1, len(self.categories)), dtype=np.int64)
+        for ordinal, row in day_rows.items():
+            daily[ordinal - first] = self._row_vector(row)
+        return first, daily
+
+    def _new_rows(self, count, at_end):
+        """扩容时新增的 count 行（at_end 表示追加在尾部）"""
+        return np.zeros((count, self._array.shape[1]), dtype=self._array.dtype)
+
+    def _ensure_day(self, ordinal):
+        """扩展数组范围以覆盖 ordinal，返回其行号"""
+        if self.origin is None:
+            self.origin = ordinal
+            self._array = np.vstack([self._array, self._new_rows(GROW_DAYS, True)])
+            return 0
+
+        offset = ordinal - self.origin
+        if offset < 0:
+            grow = max(-offset, GROW_DAYS)
+            self._array = np.vstack([self._new_rows(grow, False), self._array])
+            self.origin -= grow
+            offset += grow
+        elif offset >= self.num_days:
+            grow = max(offset - self.num_days + 1, GROW_DAYS)
+            self._array = np.vstack([self._array, self._new_rows(grow, True)])
+        return offset
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+时长解析 - 把用户输入的时长文字转换为分钟数（界面输入与批量导入共用）
+"""
+
+import re
+
+
+_DURATION_PART = re.compile(r'(\d+\.?\d*)([hm])', re.IGNORECASE)
+
+
+def parse_duration(time_str):
+    """时长文字 -> 分钟数（int）
+
+    支持 '1.5'（小时）、'1h30m'、'2h'、'90m'；无法识别时返回 0。
+    """
+    time_str = time_str.strip()
+    if 'h' in time_str or 'm' in time_str:
+        hours, minutes = 0, 0
+        for value, unit in _DURATION_PART.findall(time_str):
+            if unit.lower() == 'h':
+                hours = float(value)
+            elif unit.lower() == 'm':
+                minutes = float(value)
+        return int(hours * 60 + minutes)
+    try:
+        return int(float(time_str) * 60)
+    except (ValueError, OverflowError):
+        return 0
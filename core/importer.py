@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+批量导入 - 把其他工具导出的时间记录（CSV / JSONL，每行一条：日期、分类、时长）导入精力数据
+
+各阶段都是生成器，逐行读取、解析、按天合并，每满一批在一个事务中提交，
+内存占用与文件行数无关，只与一批内的天数和出现过的日期数有关。
+
+    read_records(path)        文件 -> {列名: 值}
+    parse_records(records)    -> (日期 'YYYY.MM.DD', 分类, 分钟)，无效行计入统计后跳过
+    batch_days(entries)       -> 每批 {日期: {分类: 分钟}}，同一天同一分类的时长相加
+    import_file(...)          逐批提交到 DataManager，未知分类自动加入分类列表
+"""
+
+import csv
+import json
+import os
+import re
+import time
+from datetime import date
+from functools import lru_cache
+
+from core.durations import parse_duration
+
+
+# 默认列名：日期、分类、时长
+DEFAULT_COLUMNS = ('date', 'category', 'duration')
+
+# 每批读取的行数，一批在一个事务中提交（JSON 存储每批整体重写一次文件）
+BATCH_ROWS = 200000
+
+# 统计中保留的错误示例条数
+MAX_ERROR_SAMPLES = 10
+
+# 'YYYY.MM.DD'、'YYYY-MM-DD'、'YYYY/M/D'，后面可以带时间（2025-03-07T08:30:00）
+_DATE_PREFIX = re.compile(r'\s*(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})')
+
+
+class ImportStats:
+    """导入统计：读取 / 导入 / 跳过的行数、写入的天数、新增分类与吞吐量"""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.days = 0
+        self.batches = 0
+        self.new_categories = []
+        self.errors = []            # [(行号, 说明), ...]，最多 MAX_ERROR_SAMPLES 条
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def skip(self, line_no, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append((line_no, message))
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        text = (f"读取 {self.rows} 行，导入 {self.imported} 行，跳过 {self.skipped} 行，"
+                f"写入 {self.days} 天（{self.batches} 批），"
+                f"用时 {self.elapsed:.2f} 秒，{self.rows_per_second:,.0f} 行/秒")
+        if self.new_categories:
+            text += f"\n新增分类: {', '.join(self.new_categories)}"
+        return text
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize_date(text):
+    """日期文字 -> 'YYYY.MM.DD'，无法识别时返回 None
+
+    同一天通常有多行记录，结果按原文字缓存。
+    """
+    match = _DATE_PREFIX.match(text)
+    if match is None:
+        return None
+    try:
+        day = date(*map(int, match.groups()))
+    except ValueError:
+        return None
+    return f'{day.year:04d}.{day.month:02d}.{day.day:02d}'
+
+
+# 导出文件中的时长写法很有限，同样按原文字缓存
+_parse_duration = lru_cache(maxsize=1 << 12)(parse_duration)
+
+
+def detect_format(path):
+    """按扩展名判断文件格式：'csv' 或 'jsonl'"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext in ('.csv', '.tsv', '.txt'):
+        return 'csv'
+    raise ValueError(f"无法识别的文件格式: {path}（支持 .csv / .jsonl）")
+
+
+def read_records(path, fmt=None, stats=None):
+    """逐行产出 (行号, {列名: 值})
+
+    CSV 第一行为表头（.tsv 以制表符分隔），JSONL 每行一个 JSON 对象，空行跳过。
+    """
+    fmt = fmt or detect_format(path)
+    # utf-8-sig：兼容 Excel 导出的带 BOM 的文件
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            delimiter = '\t' if path.lower().endswith('.tsv') else ','
+            reader = csv.DictReader(f, delimiter=delimiter)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if stats is not None:
+                    stats.rows += 1
+                    stats.skip(line_no, "不是有效的 JSON")
+                continue
+            if isinstance(record, dict):
+                yield line_no, record
+            elif stats is not None:
+                stats.rows += 1
+                stats.skip(line_no, "不是 JSON 对象")
+
+
+def parse_records(records, stats, columns=DEFAULT_COLUMNS):
+    """(行号, 记录) -> (日期, 分类, 分钟)
+
+    时长的格式与界面输入相同（'1.5' 小时、'1h30m'、'90m'），为 0 或无法识别的行跳过。
+    """
+    date_col, category_col, duration_col = columns
+    for line_no, record in records:
+        stats.rows += 1
+        date_str = normalize_date(str(record.get(date_col) or ''))
+        if date_str is None:
+            stats.skip(line_no, f"无效的日期: {record.get(date_col)!r}")
+            continue
+        category = str(record.get(category_col) or '').strip()
+        if not category:
+            stats.skip(line_no, "缺少分类")
+            continue
+        minutes = _parse_duration(str(record.get(duration_col) or ''))
+        if minutes <= 0:
+            stats.skip(line_no, f"无效的时长: {record.get(duration_col)!r}")
+            continue
+        stats.imported += 1
+        yield date_str, category, minutes
+
+
+def batch_days(entries, stats, batch_rows=BATCH_ROWS):
+    """(日期, 分类, 分钟) -> 每读取 batch_rows 行产出一批 {日期: {分类: 分钟}}"""
+    batch = {}
+    start_rows = stats.rows
+    for date_str, category, minutes in entries:
+        day = batch.setdefault(date_str, {})
+        day[category] = day.get(category, 0) + minutes
+        if stats.rows - start_rows >= batch_rows:
+            yield batch
+            batch = {}
+            start_rows = stats.rows
+    if batch:
+        yield batch
+
+
+def import_file(data_manager, path, fmt=None, columns=DEFAULT_COLUMNS,
+                merge=False, batch_rows=BATCH_ROWS, progress=None, seen_days=None):
+    """把 CSV / JSONL 文件导入精力数据，返回 ImportStats
+
+    merge 为 False 时文件中出现的日期整体替换应用中该天原有的数据（重复导入结果不变）；
+    为 True 时与原有数据相加。同一天的记录分散在多批中时，后面的批次总是累加到前面的结果上。
+    seen_days 为本次导入已写入过的日期集合（会被更新）：一次导入多个文件时传入同一个集合，
+    后面的文件累加到前面文件写入的日期上，而不是替换掉它们。
+    progress(stats) 在每批提交后调用。
+    """
+    stats = ImportStats()
+    categories = data_manager.load_categories()
+    known = set(categories)
+    if seen_days is None:
+        seen_days = set()       # 本次导入已写入过的日期
+    file_days = set()           # 本文件写入的日期（用于统计）
+
+    records = read_records(path, fmt, stats)
+    entries = parse_records(records, stats, columns)
+    for batch in batch_days(entries, stats, batch_rows):
+        new = [category for day in batch.values() for category in day if category not in known]
+        new = list(dict.fromkeys(new))
+        days = {}
+        with data_manager.transaction():
+            for date_str, day in batch.items():
+                if merge or date_str in seen_days:
+                    existing = data_manager.get_day_data(date_str) or {}
+                    for category, minutes in day.items():
+                        existing[category] = existing.get(category, 0) + minutes
+                    day = existing
+                days[date_str] = day
+            if not data_manager.save_days(days):
+                raise RuntimeError("保存精力数据失败")
+            if new:
+                categories.extend(new)
+                if not data_manager.save_categories(categories):
+                    raise RuntimeError("保存分类失败")
+
+        known.update(new)
+        stats.new_categories.extend(new)
+        file_days.update(batch)
+        stats.days = len(file_days)
+        seen_days.update(batch)
+        stats.batches += 1
+        stats.elapsed = time.perf_counter() - stats.started
+        if progress is not None:
+            progress(stats)
+
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
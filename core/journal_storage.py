@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+日志存储 - 快照 + 追加写日志（write-ahead journal）
+
+修改以一行 JSON 追加到快照旁的 .journal 文件，写入量只与本次修改有关；
+读取时加载快照并重放日志。日志超过阈值后在后台线程把当前状态写成新快照并截断日志。
+"""
+
+import os
+import json
+import threading
+
+from core.storage import (JsonStorage, ENERGY, TASKS, atomic_write_text, write_temp_file,
+                          fsync_dir, read_json)
+
+
+# 日志超过该大小（字节）后触发后台压缩
+DEFAULT_COMPACT_THRESHOLD = 256 * 1024
+
+
+def _apply_op(name, doc, op, task_positions=None):
+    """把一条日志记录应用到文档上（重复应用结果不变）"""
+    key, value = op['key'], op.get('value')
+    if name == ENERGY:
+        if op['op'] == 'put':
+            doc[key] = value
+        else:
+            doc.pop(key, None)
+        return
+
+    tasks = doc.setdefault('tasks', [])
+    if task_positions is None:
+        task_positions = {t['id']: i for i, t in enumerate(tasks)}
+    position = task_positions.get(key)
+    if op['op'] == 'put':
+        if position is None:
+            task_positions[key] = len(tasks)
+            tasks.append(value)
+        else:
+            tasks[position] = value
+    elif position is not None:
+        del tasks[position]
+        task_positions.clear()
+        task_positions.update((t['id'], i) for i, t in enumerate(tasks))
+
+
+class JournalStorage(JsonStorage):
+    """在 JsonStorage 基础上为 energy / tasks 增加追加写日志
+
+    追加的日志行同样参与组提交：commit_window 内的多条日志合并为一次写入和一次 fsync。
+    """
+
+    def __init__(self, paths, compact_threshold=DEFAULT_COMPACT_THRESHOLD,
+                 journaled=(ENERGY, TASKS), commit_window=0.0):
+        super().__init__(paths, commit_window=commit_window)
+        self.compact_threshold = compact_threshold
+        self.journaled = set(journaled)
+        self.compactions = 0
+        # 与组提交共用一把锁，提交线程追加日志时读写互斥
+        self._lock = self._commit_lock
+        # name -> 尚未写入磁盘的日志行
+        self._journal_buffer = {}
+        # name -> ((快照签名, 日志签名), 文档)
+        self._docs = {}
+        # name -> 代数，整体重写后递增，使进行中的压缩作废
+        self._generations = {}
+        self._compactors = {}
+
+    def journal_path(self, name):
+        return self.paths[name] + '.journal'
+
+    def _signature_or_none(self, path):
+        try:
+            return self._file_signature(path)
+        except OSError:
+            return None
+
+    def _signatures(self, name):
+        return (self._signature_or_none(self.paths[name]),
+                self._signature_or_none(self.journal_path(name)))
+
+    # ==================== 读取 ====================
+
+    def read(self, name):
+        if name not in self.journaled:
+            return super().read(name)
+
+        with self._lock:
+            signatures = self._signatures(name)
+            if signatures[0] is None:
+                return None
+
+            cached = self._docs.get(name)
+            if cached is not None and cached[0] == signatures:
+                self.cache_hits += 1
+                return cached[1]
+
+            self.cache_misses += 1
+            doc = read_json(self.paths[name], self.codec_of(self.paths[name]))
+            self._replay(name, doc)
+            self._docs[name] = (signatures, doc)
+            return doc
+
+    def _replay(self, name, doc):
+        """按顺序重放日志，最后一行若因崩溃写了一半则忽略"""
+        path = self.journal_path(name)
+        if not os.path.exists(path):
+            return
+        task_positions = None
+        if name == TASKS:
+            task_positions = {t['id']: i for i, t in enumerate(doc.get('tasks', []))}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue
+                _apply_op(name, doc, op, task_positions)
+
+    # ==================== 写入 ====================
+
+    def write(self, name, doc, changes=None, frozen=None):
+        if name not in self.journaled:
+            return super().write(name, doc, changes, frozen)
+
+        content = doc
+        if frozen is not None:
+            content, changes = frozen
+        with self._lock:
+            try:
+                if changes is None:
+                    self._write_snapshot(name, doc, content)
+                else:
+                    self._append(name, doc, changes, content)
+            except Exception:
+                self._docs.pop(name, None)
+                if self.commit_window <= 0:
+                    # 同步模式下失败直接报告给调用方，不留在队列中
+                    self._journal_buffer.pop(name, None)
+                raise
+
+    def _write_snapshot(self, name, doc, content=None):
+        """整体重写快照并清空日志（排队中的日志行已包含在快照里，一并丢弃）
+
+        content 为要写入的内容（默认即 doc），doc 为写入后缓存的文档。
+        """
+        self._generations[name] = self._generations.get(name, 0) + 1
+        self._journal_buffer.pop(name, None)
+        text = json.dumps(doc if content is None else content, ensure_ascii=False, indent=2)
+        atomic_write_text(self.paths[name], text,
+                          self.codec_of(self.paths[name]))
+        if os.path.exists(self.journal_path(name)):
+            os.remove(self.journal_path(name))
+        self._docs[name] = (self._signatures(name), doc)
+
+    def _append(self, name, doc, changes, content=None):
+        """把本次修改加入日志队列，按组提交规则落盘（content 同 _write_snapshot）"""
+        buffer = self._journal_buffer.setdefault(name, [])
+        if buffer:
+            self.coalesced_writes += 1
+        for key, value in changes.items():
+            op = {'op': 'put', 'key': key, 'value': value} if value is not None \
+                else {'op': 'del', 'key': key}
+            buffer.append(json.dumps(op, ensure_ascii=False) + '\n')
+
+        cached = self._docs.get(name)
+        self._docs[name] = (cached[0] if cached else self._signatures(name), doc)
+        self._request_commit()
+
+        journal_size = self._journal_size(name)
+        if journal_size >= self.compact_threshold:
+            # 压缩以磁盘上的日志偏移为界，先把排队的日志行落盘
+            self._commit()
+            self._start_compaction(name, doc if content is None else content,
+                                   self._journal_size(name))
+
+    def _journal_size(self, name):
+        size = sum(len(line.encode('utf-8')) for line in self._journal_buffer.get(name, ()))
+        signature = self._signature_or_none(self.journal_path(name))
+        return size + (signature[1] if signature else 0)
+
+    # ==================== 组提交 ====================
+
+    def _has_pending(self):
+        return super()._has_pending() or any(self._journal_buffer.values())
+
+    def _commit_locked(self):
+        super()._commit_locked()
+        for name in list(self._journal_buffer):
+            lines = self._journal_buffer[name]
+            if not lines:
+                continue
+            path = self.journal_path(name)
+            is_new = not os.path.exists(path)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            if is_new:
+                fsync_dir(path)
+            del self._journal_buffer[name]
+
+            cached = self._docs.get(name)
+            if cached is not None:
+                self._docs[name] = (self._signatures(name), cached[1])
+
+    # ==================== 压缩 ====================
+
+    def _start_compaction(self, name, doc, journal_size):
+        """在后台线程中把当前状态写成新快照"""
+        compactor = self._compactors.get(name)
+        if compactor is not None and compactor.is_alive():
+            return
+        # 序列化在调用线程完成，避免后台线程遍历正在被修改的文档
+        text = json.dumps(doc, ensure_ascii=False, indent=2)
+        compactor = threading.Thread(
+            target=self._compact, args=(name, text, journal_size,
+                                        self._generations.get(name, 0)),
+            name=f'journal-compact-{name}', daemon=True)
+        self._compactors[name] = compactor
+        compactor.start()
+
+    def _compact(self, name, text, journal_size, generation):
+        path = self.paths[name]
+        tmp_path = path + '.compact'
+        try:
+            write_temp_file(path, text, suffix='.compact', codec=self.codec_of(path))
+
+            with self._lock:
+                if self._generations.get(name, 0) != generation:
+                    # 期间快照已被整体重写，本次压缩作废
+                    os.remove(tmp_path)
+                    return
+                os.replace(tmp_path, path)
+
+                # 保留压缩开始后新追加的日志
+                journal = self.journal_path(name)
+                with open(journal, 'rb') as f:
+                    f.seek(journal_size)
+                    tail = f.read()
+                with open(journal + '.tmp', 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(journal + '.tmp', journal)
+                fsync_dir(journal)
+
+                cached = self._docs.get(name)
+                if cached is not None:
+                    self._docs[name] = (self._signatures(name), cached[1])
+                self.compactions += 1
+        except OSError:
+            # 压缩失败不影响数据：快照 + 日志仍然完整
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def compact(self, name):
+        """同步压缩：把当前内存状态写成快照并清空日志"""
+        with self._lock:
+            doc = self.read(name)
+            if doc is not None:
+                self._write_snapshot(name, doc)
+
+    def wait_for_compaction(self):
+        """等待进行中的后台压缩完成"""
+        for compactor in list(self._compactors.values()):
+            compactor.join()
+
+    def invalidate(self):
+        with self._lock:
+            # 先落盘排队的日志，否则重新加载时会丢失这些修改
+            self.flush()
+            super().invalidate()
+            self._docs.clear()
+
+    def cache_stats(self):
+        stats = super().cache_stats()
+        stats['compactions'] = self.compactions
+        return stats
+
+    def close(self):
+        self.flush()
+        self.wait_for_compaction()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+统计周期 - 当天 / 周 / 月 / 年的起止日期、显示文字和前后移动（界面与命令行报表共用）
+"""
+
+import calendar
+from datetime import timedelta
+
+
+PERIOD_MODES = ('day', 'week', 'month', 'year')
+
+
+def period_range(mode, day):
+    """day 所在统计周期的 (起始日, 结束日, 显示文字)，day 为 date / datetime"""
+    if mode == "week":
+        monday = day - timedelta(days=day.weekday())
+        sunday = monday + timedelta(days=6)
+        return monday, sunday, f"{monday.strftime('%m.%d')} ~ {sunday.strftime('%m.%d')}"
+    elif mode == "month":
+        first_day = day.replace(day=1)
+        last_day = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        return first_day, last_day, day.strftime('%Y年%m月')
+    elif mode == "year":
+        first_day = day.replace(month=1, day=1)
+        last_day = day.replace(month=12, day=31)
+        return first_day, last_day, day.strftime('%Y年')
+    else:
+        return day, day, day.strftime('%Y.%m.%d')
+
+
+def shift_period(day, mode, step):
+    """把 day 前后移动 step 个统计周期（日期超出目标月份天数时取月末）"""
+    if mode == "week":
+        return day + timedelta(weeks=step)
+    elif mode == "month":
+        month_index = day.month - 1 + step
+        year, month = day.year + month_index // 12, month_index % 12 + 1
+    elif mode == "year":
+        year, month = day.year + step, day.month
+    else:
+        return day + timedelta(days=step)
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def iter_periods(mode, start, end):
+    """依次返回与 [start, end] 有交集的每个统计周期的起始日"""
+    day = period_range(mode, start)[0]
+    while day <= end:
+        yield day
+        day = shift_period(day, mode, 1)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+分数排序键（fractional indexing）- 任务排序只需改写被移动的那一条记录
+
+排序键是 0-9a-z 组成的字符串，按字典序比较。前 RANK_WIDTH 位是定宽的“整数部分”，
+追加到末尾 / 插到开头时按 RANK_STEP 递增或递减，键长保持不变；
+插到两个任务之间时取两者的字符串中点，必要时增加小数位。
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+RANK_WIDTH = 8
+RANK_STEP = BASE ** 4
+RANK_LIMIT = BASE ** RANK_WIDTH
+
+# 第一个排序键位于整数空间的中间，前后都留有空间
+INITIAL_RANK = DIGITS[BASE // 2] + '0' * (RANK_WIDTH - 1)
+
+
+def _format_head(value):
+    chars = []
+    for _ in range(RANK_WIDTH):
+        value, digit = divmod(value, BASE)
+        chars.append(DIGITS[digit])
+    return ''.join(reversed(chars))
+
+
+def _parse_head(rank):
+    return int(rank[:RANK_WIDTH].ljust(RANK_WIDTH, '0'), BASE)
+
+
+def _midpoint(a, b):
+    """a < b（b 为 None 表示无穷大）之间的字符串，a、b 都不以 '0' 结尾"""
+    if b is not None:
+        # 跳过公共前缀（a 不足的位按 '0' 计）
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    # 首位相邻：b 多于一位时取 b 的首位即可，否则在 a 之后继续细分
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def rank_after(rank):
+    """比 rank 大的排序键"""
+    head = _parse_head(rank) + RANK_STEP
+    if head < RANK_LIMIT:
+        return _format_head(head)
+    return _midpoint(rank.rstrip('0'), None)
+
+
+def rank_before(rank):
+    """比 rank 小的排序键"""
+    head = _parse_head(rank) - RANK_STEP
+    if head > 0:
+        return _format_head(head)
+    return _midpoint('', rank.rstrip('0'))
+
+
+def rank_between(before, after):
+    """介于 before 与 after 之间的排序键，None 表示该侧不限"""
+    if before is None and after is None:
+        return INITIAL_RANK
+    if before is None:
+        return rank_before(after)
+    if after is None:
+        return rank_after(before)
+    if not before < after:
+        raise ValueError(f"排序键顺序错误: {before!r} >= {after!r}")
+    # 定宽整数部分可能以 '0' 结尾，去掉后按数值比较不变，且结果仍严格介于两者之间
+    return _midpoint(before.rstrip('0'), after.rstrip('0'))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+分类累计索引 - 按天的前缀和，任意日期区间的分类汇总只需两次查表
+"""
+
+import numpy as np
+
+from core.day_columns import DayColumns, first_seen_order
+
+
+class RollupIndex(DayColumns):
+    """按日序数组织的分类分钟数前缀和
+
+    _array[i] 为 [origin, origin + i) 内各分类的累计分钟数，
+    因此 [start, end] 的汇总为 _array[end - origin + 1] - _array[start - origin]。
+    """
+
+    def __init__(self):
+        super().__init__(np.zeros((1, 0), dtype=np.int64))
+
+    @classmethod
+    def build(cls, day_rows):
+        """由 {日序数: {分类: 分钟}} 一次性构建索引"""
+        index = cls()
+        if not day_rows:
+            return index
+
+        first, daily = index._daily_rows(day_rows)
+        index.origin = first
+        index._array = np.zeros((daily.shape[0] + 1, daily.shape[1]), dtype=np.int64)
+        np.cumsum(daily, axis=0, out=index._array[1:])
+        return index
+
+    @property
+    def num_days(self):
+        return self._array.shape[0] - 1
+
+    def _new_rows(self, count, at_end):
+        if at_end:
+            # 尾部延续最后一行：新增的日子没有数据，前缀和不变
+            return np.repeat(self._array[-1:], count, axis=0)
+        # 前部补零：新增的日子没有数据，前缀和保持为 0
+        return super()._new_rows(count, at_end)
+
+    def day_vector(self, ordinal):
+        """某天各分类分钟数（按列序号）"""
+        if self.origin is None:
+            return np.zeros(len(self.categories), dtype=np.int64)
+        offset = ordinal - self.origin
+        if offset < 0 or offset >= self.num_days:
+            return np.zeros(self._array.shape[1], dtype=np.int64)
+        return self._array[offset + 1] - self._array[offset]
+
+    def set_day(self, ordinal, row):
+        """增量更新某天的数据（row 为空表示删除当天）"""
+        for category in row:
+            self._category_id(category)
+        offset = self._ensure_day(ordinal)
+        delta = self._row_vector(row) - self.day_vector(ordinal)
+        if delta.any():
+            self._array[offset + 1:] += delta
+
+    def range_vector(self, start, end):
+        """[start, end] 闭区间（日序数）的分类分钟数向量"""
+        if self.origin is None or end < start:
+            return np.zeros(len(self.categories), dtype=np.int64)
+        lo = min(max(start - self.origin, 0), self.num_days)
+        hi = min(max(end - self.origin + 1, 0), self.num_days)
+        return self._array[hi] - self._array[lo]
+
+    def first_days(self, start, end, cids):
+        """各列（cids）在 [start, end] 内第一次有分钟数的日序数 {分类: 日序数}"""
+        lo = min(max(start - self.origin, 0), self.num_days)
+        hi = min(max(end - self.origin + 1, 0), self.num_days)
+        window = self._array[lo:hi + 1]
+        first_days = {}
+        for cid in cids:
+            # 分钟数非负时前缀和单调不减：第一次超过区间起点值的行，即区间内第一次有分钟数的日子
+            row = int(np.searchsorted(window[:, cid], window[0, cid], side='right'))
+            first_days[self.categories[cid]] = self.origin + lo + row - 1
+        return first_days
+
+    def aggregate(self, start, end, row_of=None):
+        """[start, end] 闭区间的分类汇总 {分类: 分钟}，省略为 0 的分类
+
+        分类按在区间内第一次出现的日期排序（与逐日累加的结果顺序相同，决定图表的配色与图例顺序），
+        同一天第一次出现的分类按 row_of(日序数) 返回的当天数据排列。
+        """
+        totals = self.range_vector(start, end)
+        cids = np.flatnonzero(totals)
+        if len(cids) == 0:
+            return {}
+        order = first_seen_order(self.first_days(start, end, cids), row_of)
+        return {category: int(totals[self._category_ids[category]]) for category in order}
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+按年分片存储 - 精力数据按年份拆分为 energy/2025.json、energy/2026.json ...
+
+读取时只建立分片目录，某一年的数据在第一次被访问时才加载；保存单日只重写该年的分片。
+任务和分类文档仍为单个 JSON 文件（与 JsonStorage 相同）。
+"""
+
+import os
+import threading
+from datetime import date
+
+from core.date_keys import key_ordinal, ordinal_to_key, ordinal_rows
+from core.rollup_index import RollupIndex
+from core.storage import JsonStorage, LazyEnergyData, copy_document, ENERGY
+
+
+# 分片文件所在的子目录名
+SHARD_DIR_NAME = 'energy'
+
+# 日期以外的键（不应出现，迁移时保留）所在的分片
+OTHER_SHARD = 'other'
+
+_NOT_LOADED = object()
+
+
+def shard_of(date_str):
+    """日期字符串 'YYYY.MM.DD' 所属的分片（年份）"""
+    year = date_str[0:4]
+    return year if year.isdigit() else OTHER_SHARD
+
+
+class ShardedEnergyData(LazyEnergyData):
+    """{日期: {分类: 分钟}} 的按年分片视图
+
+    按单个日期读写只加载对应年份；遍历全部键会加载所有分片。
+    修改过的年份记录在 dirty 中，由存储后端写回后清除。
+    """
+
+    def __init__(self, shard_ids, loader):
+        self._shards = {shard_id: _NOT_LOADED for shard_id in shard_ids}
+        self._loader = loader               # 分片 id -> dict 或 None
+        self._load_lock = threading.Lock()
+        self._rollups = {}                  # 分片 id -> RollupIndex，用于区间汇总
+        self.dirty = set()
+
+    def shard_ids(self):
+        return sorted(self._shards)
+
+    def loaded_shards(self):
+        return [shard_id for shard_id in self.shard_ids() if self._shards[shard_id] is not _NOT_LOADED]
+
+    def shard(self, shard_id, create=False):
+        """取得某个分片（首次访问时加载），不存在且 create 为 False 时返回 None"""
+        shard = self._shards.get(shard_id)
+        if shard is None or shard is _NOT_LOADED:
+            with self._load_lock:
+                shard = self._shards.get(shard_id)
+                if shard is _NOT_LOADED:
+                    shard = self._loader(shard_id)
+                    if shard is None:
+                        shard = {}
+                    self._shards[shard_id] = shard
+                elif shard is None:
+                    if not create:
+                        return None
+                    shard = self._shards[shard_id] = {}
+        return shard
+
+    def __getitem__(self, key):
+        shard = self.shard(shard_of(key))
+        if shard is None:
+            raise KeyError(key)
+        return shard[key]
+
+    def __setitem__(self, key, value):
+        shard_id = shard_of(key)
+        self.shard(shard_id, create=True)[key] = value
+        self.dirty.add(shard_id)
+        self._update_rollup(shard_id, key, value)
+
+    def __delitem__(self, key):
+        shard_id = shard_of(key)
+        shard = self.shard(shard_id)
+        if shard is None:
+            raise KeyError(key)
+        del shard[key]
+        self.dirty.add(shard_id)
+        self._update_rollup(shard_id, key, {})
+
+    def __iter__(self):
+        for shard_id in self.shard_ids():
+            yield from list(self.shard(shard_id))
+
+    def __len__(self):
+        return sum(len(self.shard(shard_id)) for shard_id in self.shard_ids())
+
+    def _years(self, start, end):
+        """与 [start, end]（日序数，None 表示不限）相交的年份分片"""
+        first = None if start is None else date.fromordinal(start).year
+        last = None if end is None else date.fromordinal(end).year
+        for shard_id in self.shard_ids():
+            if not shard_id.isdigit():
+                continue
+            year = int(shard_id)
+            if (first is None or year >= first) and (last is None or year <= last):
+                yield shard_id
+
+    def range_items(self, start, end):
+        """按日期升序产出 [start, end]（日序数）内的 (date_str, data_dict)，只加载相交的年份"""
+        for shard_id in self._years(start, end):
+            shard = self.shard(shard_id)
+            keyed = []
+            for key in shard:
+                ordinal = key_ordinal(key)
+                if ordinal is None:
+                    continue
+                if (start is None or ordinal >= start) and (end is None or ordinal <= end):
+                    keyed.append((ordinal, key))
+            keyed.sort()
+            for _, key in keyed:
+                yield key, dict(shard[key])
+
+    def _get_rollup(self, shard_id):
+        rollup = self._rollups.get(shard_id)
+        if rollup is None:
+            rollup = self._rollups[shard_id] = RollupIndex.build(ordinal_rows(self.shard(shard_id)))
+        return rollup
+
+    def _update_rollup(self, shard_id, key, row):
+        rollup = self._rollups.get(shard_id)
+        ordinal = key_ordinal(key)
+        if rollup is not None and ordinal is not None:
+            rollup.set_day(ordinal, row)
+
+    def aggregate(self, start, end):
+        """[start, end]（日序数）内各分类的分钟数，按年份依次合并每个分片的前缀和结果
+
+        每个分片的结果按日期顺序排列，按年份升序合并后与逐日累加的顺序相同。
+        """
+        totals = {}
+        for shard_id in self._years(start, end):
+            shard = self.shard(shard_id)
+            rollup = self._get_rollup(shard_id)
+            row_of = lambda ordinal: shard.get(ordinal_to_key(ordinal))
+            for category, minutes in rollup.aggregate(start, end, row_of).items():
+                totals[category] = totals.get(category, 0) + minutes
+        return totals
+
+
+class ShardedJsonStorage(JsonStorage):
+    """精力数据按年分片的 JSON 存储
+
+    read(ENERGY) 返回 ShardedEnergyData（未失效前始终是同一个对象）；
+    write(ENERGY, ...) 只写回其中被修改过的年份。传入普通 dict 时整体重写全部分片。
+    """
+
+    def __init__(self, paths, shard_dir, commit_window=0.0):
+        super().__init__(paths, commit_window=commit_window)
+        self.shard_dir = shard_dir
+        self._energy = None
+        self._energy_lock = threading.Lock()
+        self._dir_signature = None          # 上次列出年份时分片目录的签名
+
+    def shard_path(self, shard_id):
+        return os.path.join(self.shard_dir, f'{shard_id}.json')
+
+    def _shard_name(self, shard_id):
+        """分片在 JsonStorage 中的文档名（复用其文件缓存与组提交）"""
+        name = f'{ENERGY}:{shard_id}'
+        self.paths[name] = self.shard_path(shard_id)
+        return name
+
+    def _list_shards(self):
+        try:
+            names = os.listdir(self.shard_dir)
+        except OSError:
+            return []
+        return [name[:-len('.json')] for name in names if name.endswith('.json')]
+
+    def _load_shard(self, shard_id):
+        return super().read(self._shard_name(shard_id))
+
+    def exists(self, name):
+        if name != ENERGY:
+            return super().exists(name)
+        return self._energy is not None or os.path.isdir(self.shard_dir)
+
+    def _signature_or_none(self, path):
+        try:
+            return self._file_signature(path)
+        except OSError:
+            return None
+
+    def read(self, name):
+        if name != ENERGY:
+            return super().read(name)
+        with self._energy_lock:
+            if self._energy is not None and not self._energy.dirty:
+                self._energy = self._reopen_if_changed(self._energy)
+            if self._energy is None:
+                if not os.path.isdir(self.shard_dir):
+                    return None
+                self._dir_signature = self._signature_or_none(self.shard_dir)
+                self._energy = ShardedEnergyData(self._list_shards(), self._load_shard)
+            return self._energy
+
+    def _reopen_if_changed(self, energy):
+        """分片在外部被修改、新增或删除时返回新的 ShardedEnergyData，否则返回 energy
+
+        与 JsonStorage.read 相同按文件签名判断：每次检查已加载的年份，分片目录有变化时
+        重新列出年份。未变化的已加载年份（及其前缀和索引）沿用到新对象中。
+        """
+        loaded = energy.loaded_shards()
+        shard_ids = None
+        dir_signature = self._signature_or_none(self.shard_dir)
+        if dir_signature != self._dir_signature:
+            # 自己写入分片也会改变目录签名，年份列表不变时沿用原对象；
+            # 组提交窗口内新建、还没写到磁盘的年份也保留
+            self._dir_signature = dir_signature
+            with self._commit_lock:
+                queued = {shard_id for shard_id in loaded if self._shard_name(shard_id) in self._pending}
+            shard_ids = set(self._list_shards()) | queued
+
+        stale = set()
+        for shard_id in loaded:
+            path = self.shard_path(shard_id)
+            cached = self._file_cache.get(path)
+            if (cached[0] if cached else None) != self._signature_or_none(path):
+                stale.add(shard_id)
+        if not stale and (shard_ids is None or shard_ids == set(energy.shard_ids())):
+            return energy
+        if shard_ids is None:
+            shard_ids = set(energy.shard_ids())
+
+        self.cache_misses += 1
+        reopened = ShardedEnergyData(shard_ids, self._load_shard)
+        for shard_id in loaded:
+            if shard_id in shard_ids and shard_id not in stale:
+                reopened._shards[shard_id] = energy.shard(shard_id)
+                if shard_id in energy._rollups:
+                    reopened._rollups[shard_id] = energy._rollups[shard_id]
+        return reopened
+
+    def freeze(self, name, doc, changes=None):
+        if name != ENERGY or doc is not self._energy:
+            return super().freeze(name, doc, changes)
+        # 只复制被修改过的年份，并把它们从 dirty 中取出（写入失败时由 write() 放回）
+        dirty, doc.dirty = doc.dirty, set()
+        return {shard_id: copy_document(ENERGY, doc.shard(shard_id, create=True))
+                for shard_id in dirty}, None
+
+    def write(self, name, doc, changes=None, frozen=None):
+        if name != ENERGY:
+            super().write(name, doc, changes, frozen)
+            return
+        if doc is not self._energy:
+            self._write_all(doc if frozen is None else frozen[0])
+            return
+
+        if frozen is None:
+            dirty, doc.dirty = doc.dirty, set()
+            shards = {}
+        else:
+            shards = frozen[0]
+            dirty = set(shards)
+        try:
+            while dirty:
+                shard_id = min(dirty)
+                shard = doc.shard(shard_id, create=True)
+                content = shards.get(shard_id)
+                super().write(self._shard_name(shard_id), shard,
+                              frozen=None if content is None else (content, None))
+                dirty.discard(shard_id)
+        except Exception:
+            # 未写成功的年份留待下次写入
+            doc.dirty |= dirty
+            raise
+
+    def _write_all(self, doc):
+        """整体写入普通 dict：按年拆分后写全部分片，并删除已不存在的年份"""
+        shards = {}
+        for key, value in doc.items():
+            shards.setdefault(shard_of(key), {})[key] = value
+
+        os.makedirs(self.shard_dir, exist_ok=True)
+        for shard_id in sorted(shards):
+            super().write(self._shard_name(shard_id), shards[shard_id])
+        self.flush()
+        for shard_id in self._list_shards():
+            if shard_id not in shards:
+                os.remove(self.shard_path(shard_id))
+                self._file_cache.pop(self.shard_path(shard_id), None)
+
+        with self._energy_lock:
+            self._energy = ShardedEnergyData(shards, self._load_shard)
+            for shard_id, shard in shards.items():
+                self._energy._shards[shard_id] = shard
+
+    def invalidate(self):
+        super().invalidate()
+        with self._energy_lock:
+            self._energy = None
+
+
+def migrate_json_to_shards(paths, shard_dir):
+    """一次性把现有的 energy_data.json 按年拆分到 shard_dir（原文件保留不动）
+
+    paths 为 {文档名: JSON 文件路径}，精力数据文件不存在时只创建空的分片目录。
+    返回写入的分片数。
+    """
+    source = JsonStorage(paths)
+    target = ShardedJsonStorage(paths, shard_dir)
+    try:
+        target.write(ENERGY, source.read(ENERGY) or {})
+        return len(target._list_shards())
+    finally:
+        target.close()
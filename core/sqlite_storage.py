@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储后端 - 按行存储，保存单日/单个任务只写变化的行
+"""
+
+import json
+import time
+import sqlite3
+import threading
+
+from core.date_keys import key_ordinal
+from core.day_columns import first_seen_order
+from core.storage import Storage, JsonStorage, copy_changes, ENERGY, TASKS, DOCUMENTS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    day INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_days_day ON days(day);
+
+CREATE TABLE IF NOT EXISTS day_minutes (
+    date TEXT NOT NULL,
+    day INTEGER,
+    category TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (date, category)
+);
+CREATE INDEX IF NOT EXISTS idx_day_minutes_day ON day_minutes(day);
+
+CREATE TABLE IF NOT EXISTS categories (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    quadrant TEXT,
+    text TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_quadrant ON tasks(quadrant, position);
+"""
+
+# tasks 表中有独立列的字段，其余字段以 JSON 存入 extra
+TASK_COLUMNS = ('id', 'text', 'quadrant', 'completed', 'created_at')
+
+
+class SqliteStorage(Storage):
+    """SQLite 存储，读取结果缓存在内存中，其他连接写入后自动失效"""
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._docs = {}
+        self._data_version = self._current_data_version()
+
+    def _current_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_external_changes(self):
+        """其他连接提交过修改时丢弃内存缓存"""
+        version = self._current_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._docs.clear()
+
+    def exists(self, name):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM documents WHERE name = ?", (name,)).fetchone()
+            return row is not None
+
+    # ==================== 读取 ====================
+
+    def read(self, name):
+        with self._lock:
+            self._check_external_changes()
+            if name in self._docs:
+                self.cache_hits += 1
+                return self._docs[name]
+
+            if not self.exists(name):
+                return None
+
+            self.cache_misses += 1
+            if name == ENERGY:
+                doc = self._read_energy()
+            elif name == TASKS:
+                doc = self._read_tasks()
+            else:
+                doc = self._read_categories()
+            self._docs[name] = doc
+            return doc
+
+    def _read_energy(self):
+        doc = {}
+        for date_str in self._conn.execute("SELECT date FROM days ORDER BY rowid"):
+            doc[date_str[0]] = {}
+        rows = self._conn.execute(
+            "SELECT date, category, minutes FROM day_minutes ORDER BY rowid")
+        for date_str, category, minutes in rows:
+            doc.setdefault(date_str, {})[category] = minutes
+        return doc
+
+    def _read_tasks(self):
+        tasks = []
+        rows = self._conn.execute(
+            "SELECT id, text, quadrant, completed, created_at, extra "
+            "FROM tasks ORDER BY position")
+        for task_id, text, quadrant, completed, created_at, extra in rows:
+            task = {
+                'id': task_id,
+                'text': text,
+                'quadrant': quadrant,
+                'completed': bool(completed),
+                'created_at': created_at,
+            }
+            if extra:
+                task.update(json.loads(extra))
+            tasks.append(task)
+        return {'tasks': tasks}
+
+    def _read_categories(self):
+        rows = self._conn.execute("SELECT name FROM categories ORDER BY position")
+        return {'categories': [row[0] for row in rows]}
+
+    # ==================== 写入 ====================
+
+    def freeze(self, name, doc, changes=None):
+        if changes is not None:
+            # 增量写入只用到 changes 中的行
+            return None, copy_changes(changes)
+        return super().freeze(name, doc, changes)
+
+    def write(self, name, doc, changes=None, frozen=None):
+        if frozen is None:
+            self.write_many([(name, doc, changes)])
+        else:
+            self._write_docs([(name, frozen[0], frozen[1], doc)])
+
+    def write_many(self, writes):
+        """在同一个 SQLite 事务中写入多个文档，任一失败则全部回滚"""
+        self._write_docs([(name, doc, changes, doc) for name, doc, changes in writes])
+
+    def _write_docs(self, writes):
+        """writes 为 [(name, 写入的内容, changes, 写入后缓存的文档), ...]"""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                with self._conn:
+                    for name, doc, changes, _ in writes:
+                        if name == ENERGY:
+                            self._write_energy(doc, changes)
+                        elif name == TASKS:
+                            self._write_tasks(doc, changes)
+                        else:
+                            self._write_categories(doc)
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO documents(name) VALUES (?)", (name,))
+                for name, _, _, doc in writes:
+                    self._docs[name] = doc
+                self._record_commit(time.perf_counter() - started)
+            except Exception:
+                for name, _, _, _ in writes:
+                    self._docs.pop(name, None)
+                self.commit_errors += 1
+                raise
+
+    def _insert_day(self, date_str, row):
+        day = key_ordinal(date_str)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO days(date, day) VALUES (?, ?)", (date_str, day))
+        self._conn.executemany(
+            "INSERT INTO day_minutes(date, day, category, minutes) VALUES (?, ?, ?, ?)",
+            [(date_str, day, category, int(minutes)) for category, minutes in row.items()])
+
+    def _write_energy(self, doc, changes):
+        if changes is None:
+            self._conn.execute("DELETE FROM day_minutes")
+            self._conn.execute("DELETE FROM days")
+            for date_str, row in doc.items():
+                self._insert_day(date_str, row)
+            return
+
+        for date_str, row in changes.items():
+            self._conn.execute("DELETE FROM day_minutes WHERE date = ?", (date_str,))
+            if row is None:
+                self._conn.execute("DELETE FROM days WHERE date = ?", (date_str,))
+            else:
+                self._insert_day(date_str, row)
+
+    def _task_params(self, task):
+        extra = {k: v for k, v in task.items() if k not in TASK_COLUMNS}
+        return (
+            task.get('text'),
+            task.get('quadrant'),
+            1 if task.get('completed', False) else 0,
+            task.get('created_at'),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def _write_tasks(self, doc, changes):
+        if changes is None:
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.executemany(
+                "INSERT INTO tasks(id, position, text, quadrant, completed, created_at, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(task['id'], position) + self._task_params(task)
+                 for position, task in enumerate(doc.get('tasks', []))])
+            return
+
+        for task_id, task in changes.items():
+            if task is None:
+                self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                continue
+            cursor = self._conn.execute(
+                "UPDATE tasks SET text = ?, quadrant = ?, completed = ?, created_at = ?, extra = ? "
+                "WHERE id = ?", self._task_params(task) + (task_id,))
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "INSERT INTO tasks(id, position, text, quadrant, completed, created_at, extra) "
+                    "VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0) FROM tasks), ?, ?, ?, ?, ?)",
+                    (task_id,) + self._task_params(task))
+
+    def _write_categories(self, doc):
+        self._conn.execute("DELETE FROM categories")
+        self._conn.executemany(
+            "INSERT INTO categories(position, name) VALUES (?, ?)",
+            list(enumerate(doc.get('categories', []))))
+
+    # ==================== 查询 ====================
+
+    def aggregate_range(self, start, end):
+        """按分类在区间内第一次有分钟数的日期排序，同一天的按当天写入顺序（即当天数据中的键顺序）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category, SUM(minutes), MIN(CASE WHEN minutes != 0 THEN day END) "
+                "FROM day_minutes WHERE day BETWEEN ? AND ? GROUP BY category",
+                (start, end)).fetchall()
+            totals = {category: total for category, total, _ in rows if total}
+            first_days = {category: first_day for category, total, first_day in rows if total}
+
+            # 只读取各分类首日的行，取当天的写入顺序
+            day_orders = {}
+            days = sorted(set(first_days.values()))
+            for i in range(0, len(days), 500):
+                chunk = days[i:i + 500]
+                for day, category in self._conn.execute(
+                        f"SELECT day, category FROM day_minutes "
+                        f"WHERE day IN ({','.join('?' * len(chunk))}) ORDER BY rowid", chunk):
+                    day_orders.setdefault(day, []).append(category)
+
+        return {category: totals[category]
+                for category in first_seen_order(first_days, day_orders.get)}
+
+    def invalidate(self):
+        with self._lock:
+            self._docs.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(paths, db_path):
+    """一次性将现有 JSON 数据文件导入 SQLite 数据库
+
+    paths 为 {文档名: JSON 文件路径}，不存在的文件跳过。
+    """
+    source = JsonStorage(paths)
+    target = SqliteStorage(db_path)
+    try:
+        for name in DOCUMENTS:
+            doc = source.read(name)
+            if doc is not None:
+                target.write(name, doc)
+    finally:
+        target.close()
+    return db_path
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端 - DataManager 以“文档”为单位读写数据
+
+文档共三种：
+    energy      {date_str: {分类: 分钟}}
+    tasks       {'tasks': [task, ...]}
+    categories  {'categories': [分类, ...]}
+
+write() 的 changes 参数是可选的增量提示 {key: 新值 或 None(删除)}，
+energy 的 key 为日期字符串，tasks 的 key 为任务 id。
+整文件格式的后端可以忽略它，按行存储的后端据此只写变化的部分。
+
+JSON 文件可以是 gzip / xz / lzma 压缩的（energy_data.json.gz 等），按扩展名或文件头魔数识别，
+读写时流式压缩、解压，写回时保持原来的压缩格式。
+"""
+
+import os
+import gzip
+import json
+import lzma
+import time
+import threading
+from collections import deque
+from collections.abc import MutableMapping
+
+
+ENERGY = 'energy'
+TASKS = 'tasks'
+CATEGORIES = 'categories'
+DOCUMENTS = (ENERGY, TASKS, CATEGORIES)
+
+
+# 压缩格式：扩展名 -> 格式名，文件头魔数 -> 格式名
+CODEC_SUFFIXES = {'.gz': 'gzip', '.xz': 'xz', '.lzma': 'lzma'}
+CODEC_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x5d\x00\x00', 'lzma'),
+)
+# 压缩写入时每次编码的字符数，避免整份文本再复制一份字节串
+WRITE_CHUNK = 1 << 20
+GZIP_LEVEL = 6
+# xz / lzma 压缩级别：预设 1 的编码器约占 9 MB 内存（默认预设 6 约 95 MB），压缩率只差一成左右
+LZMA_PRESET = 1
+
+
+def detect_codec(path):
+    """按扩展名、再按文件头魔数判断压缩格式：None（未压缩）、'gzip'、'xz' 或 'lzma'"""
+    codec = CODEC_SUFFIXES.get(os.path.splitext(path)[1].lower())
+    if codec is not None:
+        return codec
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(6)
+    except OSError:
+        return None
+    for magic, codec in CODEC_MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def strip_codec_suffix(path):
+    """去掉压缩扩展名：energy_data.json.gz -> energy_data.json"""
+    base, ext = os.path.splitext(path)
+    return base if ext.lower() in CODEC_SUFFIXES else path
+
+
+def find_data_file(path, compression=None):
+    """返回已存在的 path 或其压缩版本（path.gz / .xz / .lzma）
+
+    都不存在时返回新文件应使用的路径：compression 为 None 时是 path 本身，否则加上对应扩展名。
+    """
+    for candidate in [path] + [path + suffix for suffix in CODEC_SUFFIXES]:
+        if os.path.exists(candidate):
+            return candidate
+    if compression is None:
+        return path
+    suffixes = {codec: suffix for suffix, codec in CODEC_SUFFIXES.items()}
+    if compression not in suffixes:
+        raise ValueError(f"未知的压缩格式: {compression}")
+    return path + suffixes[compression]
+
+
+def _compressed_writer(raw, codec):
+    if codec == 'gzip':
+        return gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=GZIP_LEVEL)
+    if codec == 'xz':
+        return lzma.LZMAFile(raw, 'wb', format=lzma.FORMAT_XZ, preset=LZMA_PRESET)
+    if codec == 'lzma':
+        return lzma.LZMAFile(raw, 'wb', format=lzma.FORMAT_ALONE, preset=LZMA_PRESET)
+    raise ValueError(f"未知的压缩格式: {codec}")
+
+
+def read_json(path, codec=None):
+    """读取 JSON 文件，压缩文件边读边解压"""
+    if codec is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    opener = gzip.open if codec == 'gzip' else lzma.open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_temp_file(path, text, suffix='.tmp', codec=None):
+    """把 text 写入 path 旁的临时文件并 fsync，返回临时文件路径
+
+    codec 不为 None 时分块编码、流式压缩写入。
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + suffix
+    if codec is None:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    with open(tmp_path, 'wb') as raw:
+        with _compressed_writer(raw, codec) as stream:
+            for i in range(0, len(text), WRITE_CHUNK):
+                stream.write(text[i:i + WRITE_CHUNK].encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    return tmp_path
+
+
+def fsync_dir(path):
+    """fsync 文件所在目录，使 os.replace 的重命名本身落盘（仅 POSIX）"""
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, text, codec=None):
+    """原子写入：临时文件 + os.replace，崩溃时目标文件要么是旧内容要么是新内容"""
+    tmp_path = write_temp_file(path, text, codec=codec)
+    try:
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    fsync_dir(path)
+
+
+class LazyEnergyData(MutableMapping):
+    """不把全部数据展开为 dict 的精力数据文档（按需加载的分片、内存映射的快照等）
+
+    按日期读写与普通 dict 相同；区间遍历和汇总由文档自己完成，只访问区间涉及的数据。
+    start / end 为日序数，None 表示该端不限。
+    """
+
+    def range_items(self, start, end):
+        """按日期升序产出 [start, end] 内的 (date_str, data_dict)"""
+        raise NotImplementedError
+
+    def aggregate(self, start, end):
+        """[start, end] 内各分类的分钟数"""
+        raise NotImplementedError
+
+
+def copy_document(name, doc):
+    """复制文档（复制到每天 / 每个任务一层，值本身不可变）"""
+    if name == ENERGY:
+        return {key: dict(row) for key, row in doc.items()}
+    if name == TASKS:
+        return dict(doc, tasks=[dict(task) for task in doc.get('tasks', [])])
+    return dict(doc, categories=list(doc.get('categories', [])))
+
+
+def copy_changes(changes):
+    """复制增量提示 {key: 新值 或 None}"""
+    if changes is None:
+        return None
+    return {key: None if value is None else dict(value) for key, value in changes.items()}
+
+
+class Storage:
+    """存储后端基类"""
+
+    def __init__(self):
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 提交统计
+        self.commits = 0
+        self.coalesced_writes = 0
+        self.commit_errors = 0
+        self._commit_latencies = deque(maxlen=256)
+
+    def _record_commit(self, seconds):
+        self.commits += 1
+        self._commit_latencies.append(seconds)
+
+    def exists(self, name):
+        """文档是否已存在"""
+        raise NotImplementedError
+
+    def read(self, name):
+        """读取文档，不存在返回 None
+
+        文档未变化时应返回同一个对象，DataManager 依赖对象身份判断索引是否需要重建。
+        """
+        raise NotImplementedError
+
+    def freeze(self, name, doc, changes=None):
+        """复制出写入 doc 所需的内容，交给 write() 的 frozen 参数
+
+        调用方在持有修改 doc 的锁时调用（只复制内存，不做磁盘 I/O），之后可以在锁外
+        write()，期间对 doc 的修改不影响本次写入的内容。
+        """
+        return copy_document(name, doc), copy_changes(changes)
+
+    def write(self, name, doc, changes=None, frozen=None):
+        """持久化文档，失败时抛出异常
+
+        frozen 为 freeze() 的结果时写入其中的内容；doc 仍是之后 read() 返回的对象。
+        """
+        raise NotImplementedError
+
+    def write_many(self, writes):
+        """持久化多个文档，writes 为 [(name, doc, changes), ...]
+
+        默认逐个调用 write()，每个文档各自原子写入；支持事务的后端可以整体原子提交。
+        """
+        for name, doc, changes in writes:
+            self.write(name, doc, changes)
+
+    def aggregate_range(self, start, end):
+        """在存储层汇总 [start, end]（日序数）内的分类分钟数
+
+        返回 None 表示后端不支持，由 DataManager 使用内存索引计算。
+        """
+        return None
+
+    def flush(self):
+        """立即提交尚未落盘的修改"""
+
+    def invalidate(self):
+        """丢弃内存缓存，下次读取时重新加载"""
+
+    def cache_stats(self):
+        """缓存命中统计"""
+        return {'hits': self.cache_hits, 'misses': self.cache_misses}
+
+    def commit_stats(self):
+        """提交统计：次数、被合并的写入数、失败数、提交耗时（毫秒）"""
+        latencies = list(self._commit_latencies)
+        stats = {
+            'commits': self.commits,
+            'coalesced_writes': self.coalesced_writes,
+            'errors': self.commit_errors,
+            'last_ms': 0.0,
+            'avg_ms': 0.0,
+            'max_ms': 0.0,
+        }
+        if latencies:
+            stats['last_ms'] = latencies[-1] * 1000
+            stats['avg_ms'] = sum(latencies) / len(latencies) * 1000
+            stats['max_ms'] = max(latencies) * 1000
+        return stats
+
+    def close(self):
+        """释放资源"""
+
+
+class JsonStorage(Storage):
+    """JSON 文件存储 - 每个文档一个文件，解析结果按文件签名缓存
+
+    写入采用临时文件 + os.replace 的原子提交。commit_window > 0 时开启组提交：
+    窗口内的多次修改只在内存中排队，窗口结束时每个文件只写入并 fsync 一次。
+    """
+
+    def __init__(self, paths, commit_window=0.0):
+        super().__init__()
+        self.paths = dict(paths)
+        self.commit_window = commit_window
+        # 文件内容缓存：path -> ((mtime_ns, size), 解析后的数据)
+        self._file_cache = {}
+        # path -> 压缩格式（首次访问时识别，写回时保持不变）
+        self._codecs = {}
+
+        # 组提交状态
+        self._commit_lock = threading.RLock()
+        self._pending = {}                  # name -> (序列化文本, 文档)
+        self._commit_timer = None
+
+    def _file_signature(self, path):
+        """文件签名：(mtime_ns, size)，任一变化即视为文件已被修改"""
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def codec_of(self, path):
+        """文件的压缩格式，文件存在时按内容识别并记住"""
+        codec = self._codecs.get(path)
+        if codec is None and path not in self._codecs:
+            codec = detect_codec(path)
+            if os.path.exists(path) or codec is not None:
+                self._codecs[path] = codec
+        return codec
+
+    def exists(self, name):
+        with self._commit_lock:
+            return name in self._pending or os.path.exists(self.paths[name])
+
+    def read(self, name):
+        with self._commit_lock:
+            pending = self._pending.get(name)
+            if pending is not None:
+                self.cache_hits += 1
+                return pending[1]
+
+        path = self.paths[name]
+        try:
+            signature = self._file_signature(path)
+        except OSError:
+            return None
+
+        cached = self._file_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            self.cache_hits += 1
+            return cached[1]
+
+        self.cache_misses += 1
+        doc = read_json(path, self.codec_of(path))
+        self._file_cache[path] = (signature, doc)
+        return doc
+
+    def write(self, name, doc, changes=None, frozen=None):
+        # 在调用线程序列化，提交线程只负责落盘，不会遍历正在被修改的文档
+        content = doc if frozen is None else frozen[0]
+        text = json.dumps(content, ensure_ascii=False, indent=2)
+        with self._commit_lock:
+            if name in self._pending:
+                self.coalesced_writes += 1
+            self._pending[name] = (text, doc)
+            try:
+                self._request_commit()
+            except Exception:
+                # 同步模式下写入失败直接报告给调用方，不留在队列中
+                self._pending.pop(name, None)
+                raise
+
+    # ==================== 组提交 ====================
+
+    def _request_commit(self):
+        """同步模式立即提交，组提交模式在窗口结束时统一提交"""
+        if self.commit_window <= 0:
+            self._commit()
+        elif self._commit_timer is None:
+            self._commit_timer = threading.Timer(self.commit_window, self._commit_in_background)
+            self._commit_timer.daemon = True
+            self._commit_timer.start()
+
+    def _commit_in_background(self):
+        try:
+            self._commit()
+        except Exception:
+            # 待提交内容保留在队列中，下次写入或 flush() 时重试
+            self.commit_errors += 1
+
+    def _commit(self):
+        """提交所有排队的修改，记录提交耗时"""
+        with self._commit_lock:
+            self._commit_timer = None
+            if not self._has_pending():
+                return
+            started = time.perf_counter()
+            self._commit_locked()
+            self._record_commit(time.perf_counter() - started)
+
+    def _has_pending(self):
+        return bool(self._pending)
+
+    def _commit_locked(self):
+        while self._pending:
+            name, (text, doc) = next(iter(self._pending.items()))
+            path = self.paths[name]
+            try:
+                atomic_write_text(path, text, self.codec_of(path))
+                self._file_cache[path] = (self._file_signature(path), doc)
+            except Exception:
+                # 写入失败时内存数据可能已与磁盘不一致，丢弃缓存
+                self._file_cache.pop(path, None)
+                raise
+            del self._pending[name]
+
+    def flush(self):
+        with self._commit_lock:
+            if self._commit_timer is not None:
+                self._commit_timer.cancel()
+            self._commit()
+
+    def commit_stats(self):
+        with self._commit_lock:
+            return super().commit_stats()
+
+    def invalidate(self):
+        self._file_cache.clear()
+
+    def cache_stats(self):
+        stats = super().cache_stats()
+        stats['files'] = len(self._file_cache)
+        return stats
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+任务索引 - 按 id 查找任务、按象限列出任务，不随任务总数线性增长
+"""
+
+from bisect import bisect_left, insort
+
+from core.ranking import rank_between
+
+
+class TaskIndex:
+    """任务 id -> 任务，以及每个象限内按顺序排列的 id 列表
+
+    象限内的顺序由任务的 rank 字段（分数排序键，见 core.ranking）决定，rank 相同时按 id 排序。
+    调整顺序只需改写被移动任务的 rank，其他任务不变。
+    没有 rank 的旧任务在构建索引时按列表顺序补上，记录在 assigned 中，由调用方持久化。
+
+    传入的任务列表（即持久化的 data['tasks']）通过 append / pop 随索引一起维护，
+    删除时用最后一个任务填补空位，不需要扫描或移动列表。
+    """
+
+    def __init__(self, tasks=()):
+        self._tasks = {}            # task_id -> task
+        self._keys = {}             # task_id -> 排序键
+        self._quadrants = {}        # quadrant -> [(排序键, task_id), ...]，保持有序
+        self.assigned = []          # 构建时补上 rank 的任务
+
+        self._list = tasks if isinstance(tasks, list) else list(tasks)
+        self._slots = {task['id']: i for i, task in enumerate(self._list)}   # task_id -> 列表下标
+
+        unranked = []
+        for task in tasks:
+            if task.get('rank'):
+                self._insert(task)
+            else:
+                unranked.append(task)
+        for task in unranked:
+            self.add(task)
+            self.assigned.append(task)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def get(self, task_id):
+        """按 id 查找任务，不存在返回 None"""
+        return self._tasks.get(task_id)
+
+    def tasks_in(self, quadrant):
+        """某象限的任务列表（按顺序）"""
+        return [self._tasks[task_id] for _, task_id in self._quadrants.get(quadrant, ())]
+
+    def ids_in(self, quadrant):
+        """某象限的任务 id 列表（按顺序）"""
+        return [task_id for _, task_id in self._quadrants.get(quadrant, ())]
+
+    def position(self, task_id):
+        """任务在其象限中的行号，不存在返回 None"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+        return bisect_left(self._quadrants[task.get('quadrant')], (self._keys[task_id], task_id))
+
+    def add(self, task):
+        """加入任务，没有 rank 时排到其象限末尾"""
+        if not task.get('rank'):
+            task['rank'] = rank_between(self._last_rank(task.get('quadrant')), None)
+        self._insert(task)
+
+    def append(self, task):
+        """把新任务追加到任务列表末尾并加入索引"""
+        self._slots[task['id']] = len(self._list)
+        self._list.append(task)
+        self.add(task)
+
+    def pop(self, task_id):
+        """从索引和任务列表中移除任务，返回被移除的任务（不存在返回 None）"""
+        task = self.remove(task_id)
+        slot = self._slots.pop(task_id, None)
+        if slot is not None:
+            last = self._list.pop()
+            if slot < len(self._list):
+                self._list[slot] = last
+                self._slots[last['id']] = slot
+        return task
+
+    def remove(self, task_id):
+        """移除任务，返回被移除的任务"""
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._discard(task.get('quadrant'), self._keys.pop(task_id), task_id)
+        return task
+
+    def move(self, task_id, old_quadrant):
+        """任务的 quadrant 字段已修改后，把它从 old_quadrant 移到新象限末尾"""
+        task = self._tasks[task_id]
+        self._discard(old_quadrant, self._keys[task_id], task_id)
+        task['rank'] = rank_between(self._last_rank(task.get('quadrant')), None)
+        self._insert(task)
+
+    def reorder(self, task_id, before_id=None, after_id=None):
+        """在象限内移动任务，使其紧跟 before_id 之后 / 紧挨 after_id 之前
+
+        两者给出一个即可，都为 None 时移到末尾。只修改该任务的 rank，返回该任务。
+        """
+        task = self._tasks[task_id]
+        quadrant = task.get('quadrant')
+        self._discard(quadrant, self._keys[task_id], task_id)
+        try:
+            entries = self._quadrants[quadrant]
+            if before_id is not None:
+                slot = self._slot_of(before_id, quadrant) + 1
+            elif after_id is not None:
+                slot = self._slot_of(after_id, quadrant)
+            else:
+                slot = len(entries)
+            if after_id is not None and self._slot_of(after_id, quadrant) != slot:
+                raise ValueError(f"任务 {before_id} 与 {after_id} 不相邻")
+
+            before = entries[slot - 1][0] if slot > 0 else None
+            after = entries[slot][0] if slot < len(entries) else None
+            task['rank'] = rank_between(before, after)
+        finally:
+            self._insert(task)
+        return task
+
+    def _last_rank(self, quadrant):
+        entries = self._quadrants.get(quadrant)
+        return entries[-1][0] if entries else None
+
+    def _slot_of(self, task_id, quadrant):
+        """task_id 在 quadrant 中的行号，不在该象限时抛出 ValueError"""
+        task = self._tasks.get(task_id)
+        if task is None or task.get('quadrant') != quadrant:
+            raise ValueError(f"任务 {task_id} 不在象限 {quadrant} 中")
+        return bisect_left(self._quadrants[quadrant], (self._keys[task_id], task_id))
+
+    def _insert(self, task):
+        task_id = task['id']
+        key = task['rank']
+        self._tasks[task_id] = task
+        self._keys[task_id] = key
+        insort(self._quadrants.setdefault(task.get('quadrant'), []), (key, task_id))
+
+    def _discard(self, quadrant, key, task_id):
+        entries = self._quadrants.get(quadrant, [])
+        i = bisect_left(entries, (key, task_id))
+        if i < len(entries) and entries[i][1] == task_id:
+            del entries[i]
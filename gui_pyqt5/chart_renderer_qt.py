@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+PyQt5 版本 - 后台图表渲染（在线程池中绘制，结果以 QImage 送回界面线程）
+"""
+
+from collections import deque
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from core.chart_cache import chart_fingerprint
+
+
+# 预取任务的请求编号（结果只进入缓存，不送回界面）
+PREFETCH_ID = -1
+
+# 记录最近预取过的图表指纹数量上限，用于统计预取命中
+MAX_PREFETCHED_KEYS = 256
+
+
+def chart_to_image(chart, ratio):
+    """RenderedChart -> QImage（拷贝像素数据，并标记屏幕像素比）"""
+    image = QImage(chart.rgba, chart.width, chart.height, chart.width * 4,
+                   QImage.Format_RGBA8888).copy()
+    image.setDevicePixelRatio(ratio)
+    return image
+
+
+class _RenderSignals(QObject):
+    """QRunnable 不能发信号，借助界面线程中创建的 QObject 转发"""
+
+    finished = pyqtSignal(int, object)     # 请求编号, QImage 或 None
+    failed = pyqtSignal(int, str)          # 请求编号, 错误信息
+
+
+class _RenderJob(QRunnable):
+    def __init__(self, chart_generator, request_id, data_dict, title, ratio, signals):
+        super().__init__()
+        self.chart_generator = chart_generator
+        self.request_id = request_id
+        self.data_dict = data_dict
+        self.title = title
+        self.ratio = ratio
+        self.signals = signals
+
+    def run(self):
+        try:
+            chart = self.chart_generator.draw_pie_chart(self.data_dict, self.title,
+                                                        dpi=100 * self.ratio)
+            if self.request_id == PREFETCH_ID:
+                image = None
+            else:
+                image = chart_to_image(chart, self.ratio) if chart else None
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, image)
+
+
+class ChartRenderer(QObject):
+    """每个视图一个：同一时间最多一个渲染任务在运行，另有最多一个排队
+
+    新请求会替换排队中的旧请求；运行中的任务完成时若已不是最新请求，结果直接丢弃。
+    缓存命中时不经过线程池，立即通过 chart_ready 送回。
+    没有待显示的请求时依次执行预取任务，把相邻日期 / 周期的图表提前画进缓存。
+    """
+
+    chart_ready = pyqtSignal(object)    # QImage，None 表示无数据
+    render_failed = pyqtSignal(str)
+
+    def __init__(self, chart_generator, parent=None):
+        super().__init__(parent)
+        self.chart_generator = chart_generator
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self._signals = _RenderSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+        self._latest_id = 0
+        self._running = False
+        self._queued = None             # 排队中的 (请求编号, 数据, 标题, 像素比)
+
+        self._prefetch_queue = deque()  # [(数据, 标题, 像素比), ...]
+        self._prefetched_keys = set()
+
+        self.jobs_started = 0
+        self.jobs_dropped = 0
+        # 命中统计
+        self.requests = 0
+        self.cache_hits = 0
+        self.prefetched = 0
+        self.prefetch_hits = 0
+
+    def request(self, data_dict, title, ratio=1.0):
+        """请求渲染，结果通过 chart_ready 送回（只保留最新的请求）"""
+        self._latest_id += 1
+        self.requests += 1
+        cached = self.chart_generator.cached_pie_chart(data_dict, title, dpi=100 * ratio)
+        if cached is not None:
+            self.cache_hits += 1
+            key = chart_fingerprint(data_dict, title, 100 * ratio)
+            if key in self._prefetched_keys:
+                self._prefetched_keys.discard(key)
+                self.prefetch_hits += 1
+            self._drop_queued()
+            self.chart_ready.emit(chart_to_image(cached, ratio))
+            return
+
+        self._drop_queued()
+        self._queued = (self._latest_id, dict(data_dict), title, ratio)
+        self._start_next()
+
+    def prefetch(self, requests, ratio=1.0):
+        """替换预取队列：requests 为 [(数据, 标题), ...]，在没有待显示的请求时逐个渲染"""
+        self._prefetch_queue = deque((dict(data_dict), title, ratio)
+                                     for data_dict, title in requests)
+        self._start_next()
+
+    def cancel(self):
+        """放弃所有尚未送回的渲染结果"""
+        self._latest_id += 1
+        self._drop_queued()
+
+    def is_busy(self):
+        return self._running or self._queued is not None or bool(self._prefetch_queue)
+
+    def _drop_queued(self):
+        if self._queued is not None:
+            self._queued = None
+            self.jobs_dropped += 1
+
+    def _start_next(self):
+        if self._running:
+            return
+        if self._queued is not None:
+            request_id, data_dict, title, ratio = self._queued
+            self._queued = None
+        else:
+            job = self._next_prefetch()
+            if job is None:
+                return
+            request_id, data_dict, title, ratio = job
+        self._running = True
+        self.jobs_started += 1
+        self.pool.start(_RenderJob(self.chart_generator, request_id, data_dict, title,
+                                   ratio, self._signals))
+
+    def _next_prefetch(self):
+        """取出下一个尚未缓存的预取任务"""
+        while self._prefetch_queue:
+            data_dict, title, ratio = self._prefetch_queue.popleft()
+            key = chart_fingerprint(data_dict, title, 100 * ratio)
+            if self.chart_generator.cache.peek(key) is not None:
+                continue
+            if len(self._prefetched_keys) >= MAX_PREFETCHED_KEYS:
+                self._prefetched_keys.clear()
+            self._prefetched_keys.add(key)
+            return PREFETCH_ID, data_dict, title, ratio
+        return None
+
+    def _on_finished(self, request_id, image):
+        self._running = False
+        if request_id == PREFETCH_ID:
+            self.prefetched += 1
+        elif request_id == self._latest_id:
+            self.chart_ready.emit(image)
+        else:
+            # 用户已切换到其他日期，过期结果丢弃（图像仍留在缓存中）
+            self.jobs_dropped += 1
+        self._start_next()
+
+    def _on_failed(self, request_id, message):
+        self._running = False
+        if request_id == self._latest_id:
+            self.render_failed.emit(message)
+        self._start_next()
+
+    def stats(self):
+        """渲染任务数、丢弃的过期任务数、请求的缓存命中率与预取命中数"""
+        return {
+            'started': self.jobs_started,
+            'dropped': self.jobs_dropped,
+            'requests': self.requests,
+            'hits': self.cache_hits,
+            'hit_rate': self.cache_hits / self.requests if self.requests else 0.0,
+            'prefetched': self.prefetched,
+            'prefetch_hits': self.prefetch_hits,
+        }
+
+    def wait(self, msecs=-1):
+        """等待进行中的渲染任务结束（退出前调用）"""
+        return self.pool.waitForDone(msecs)
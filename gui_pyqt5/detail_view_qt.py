@@ -3,23 +3,26 @@
 PyQt5 版本 - 精力分配统计视图（完整优化版）
 """
 
-import re
 from datetime import datetime, timedelta
-import calendar
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QLineEdit, QPushButton, QFrame, QGridLayout,
                              QMessageBox, QInputDialog, QCalendarWidget,
                              QSizePolicy, QButtonGroup, QRadioButton,
                              QGraphicsDropShadowEffect, QScrollArea)
-from PyQt5.QtCore import QDate, Qt, QLocale
-from PyQt5.QtGui import QFont, QColor, QTextCharFormat
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PyQt5.QtCore import QDate, Qt, QLocale, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QTextCharFormat, QPixmap
+
+from core.durations import parse_duration
+from core.periods import period_range, shift_period
+from gui_pyqt5.chart_renderer_qt import ChartRenderer
 
 
 class DetailViewQt(QWidget):
     """精力分配统计视图 - 完整优化版"""
 
+    chart_displayed = pyqtSignal()      # 图表（或无数据提示）已显示
+
     def __init__(self, data_manager, chart_generator):
         super().__init__()
         self.data_manager = data_manager
@@ -28,6 +31,19 @@ class DetailViewQt(QWidget):
         self.entries = {}
         self.stat_mode = "day"
         self.stat_date = datetime.now()
+
+        # 图表在后台线程渲染，只显示最新一次请求的结果
+        self.chart_renderer = ChartRenderer(chart_generator, self)
+        self.chart_renderer.chart_ready.connect(self.show_chart_image)
+        self.chart_renderer.render_failed.connect(
+            lambda message: QMessageBox.critical(self, "错误", f"生成图表失败: {message}"))
+
+        # 零超时定时器：等当前事件处理完（界面空闲）后再预取相邻日期 / 周期
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(0)
+        self.prefetch_timer.timeout.connect(self.prefetch_neighbours)
+
         self.init_ui()
 
     def add_shadow(self, widget, blur=20, offset=3, color=QColor(0, 0, 0, 40)):
@@ -111,8 +127,8 @@ class DetailViewQt(QWidget):
         right_scroll.setWidget(right_panel)
         main_layout.addWidget(right_scroll, 1)
 
-        # 加载数据
-        self.load_data()
+        # 先让界面显示出来，再加载数据和图表
+        QTimer.singleShot(0, self.load_data)
 
 
     def create_calendar_panel(self):
@@ -736,6 +752,16 @@ class DetailViewQt(QWidget):
         self.chart_layout.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.chart_container)
 
+        # 图表与空数据提示各只创建一次，之后只切换显示和更新图像
+        self.chart_label = QLabel()
+        self.chart_label.setStyleSheet("background-color: #FFFFFF;")
+        self.chart_label.hide()
+        self.chart_layout.addWidget(self.chart_label)
+
+        self.empty_chart_widget = self.create_empty_chart_widget()
+        self.empty_chart_widget.hide()
+        self.chart_layout.addWidget(self.empty_chart_widget, alignment=Qt.AlignCenter)
+
         return card
 
 
@@ -790,49 +816,27 @@ class DetailViewQt(QWidget):
         self.stat_period_label.setText(period_str)
 
     def stat_prev_period(self):
-        if self.stat_mode == "week":
-            self.stat_date -= timedelta(weeks=1)
-        elif self.stat_mode == "month":
-            if self.stat_date.month == 1:
-                self.stat_date = self.stat_date.replace(year=self.stat_date.year - 1, month=12)
-            else:
-                self.stat_date = self.stat_date.replace(month=self.stat_date.month - 1)
-        elif self.stat_mode == "year":
-            self.stat_date = self.stat_date.replace(year=self.stat_date.year - 1)
-        
+        self.stat_date = self.shift_stat_period(self.stat_date, -1)
         self.update_stat_period_label()
         self.update_chart()
 
     def stat_next_period(self):
-        if self.stat_mode == "week":
-            self.stat_date += timedelta(weeks=1)
-        elif self.stat_mode == "month":
-            if self.stat_date.month == 12:
-                self.stat_date = self.stat_date.replace(year=self.stat_date.year + 1, month=1)
-            else:
-                self.stat_date = self.stat_date.replace(month=self.stat_date.month + 1)
-        elif self.stat_mode == "year":
-            self.stat_date = self.stat_date.replace(year=self.stat_date.year + 1)
-        
+        self.stat_date = self.shift_stat_period(self.stat_date, 1)
         self.update_stat_period_label()
         self.update_chart()
 
-    def get_stat_period_range(self):
-        if self.stat_mode == "week":
-            monday = self.stat_date - timedelta(days=self.stat_date.weekday())
-            sunday = monday + timedelta(days=6)
-            return monday, sunday, f"{monday.strftime('%m.%d')} ~ {sunday.strftime('%m.%d')}"
-        elif self.stat_mode == "month":
-            first_day = self.stat_date.replace(day=1)
-            last_day = self.stat_date.replace(day=calendar.monthrange(self.stat_date.year, self.stat_date.month)[1])
-            return first_day, last_day, self.stat_date.strftime('%Y年%m月')
-        elif self.stat_mode == "year":
-            first_day = self.stat_date.replace(month=1, day=1)
-            last_day = self.stat_date.replace(month=12, day=31)
-            return first_day, last_day, self.stat_date.strftime('%Y年')
-        else:
-            date = datetime.strptime(self.current_date, '%Y.%m.%d')
-            return date, date, self.current_date
+    def shift_stat_period(self, stat_date, step, mode=None):
+        """把 stat_date 前后移动 step 个统计周期（日期超出目标月份天数时取月末）"""
+        mode = mode or self.stat_mode
+        if mode == "day":
+            return stat_date
+        return shift_period(stat_date, mode, step)
+
+    def get_stat_period_range(self, mode=None, stat_date=None):
+        mode = mode or self.stat_mode
+        if mode == "day":
+            stat_date = datetime.strptime(self.current_date, '%Y.%m.%d')
+        return period_range(mode, stat_date or self.stat_date)
 
     # ========== 数据操作 ==========
     def load_data(self):
@@ -857,64 +861,57 @@ class DetailViewQt(QWidget):
 
     def update_chart(self, data_dict=None, title=None):
         """更新图表显示"""
-        # 获取统计数据
-        if self.stat_mode == "day":
-            raw_data = self.data_manager.get_day_data(self.current_date)
-            if raw_data:
-                data_dict = {k: v / 60 for k, v in raw_data.items()}
-            else:
-                data_dict = {}
-            title = f"{self.current_date} 精力分配"
-        else:
-            start_date, end_date, period_str = self.get_stat_period_range()
-            raw_data = self.aggregate_data(start_date, end_date)
-            if raw_data:
-                data_dict = {k: v / 60 for k, v in raw_data.items()}
-            else:
-                data_dict = {}
-            title = f"{period_str} 精力分配"
-        
-        # 清除旧图表
-        for i in reversed(range(self.chart_layout.count())):
-            child = self.chart_layout.itemAt(i).widget()
-            if child:
-                child.setParent(None)
-                child.deleteLater()
+        data_dict, title = self.chart_request(self.stat_mode, self.current_date, self.stat_date)
+
+        # 当前图表显示后，空闲时预取相邻日期 / 周期
+        self.prefetch_timer.start()
 
         if not data_dict or sum(data_dict.values()) == 0:
             self.display_empty_chart()
             return
 
-        # 创建图表
-        fig = self.chart_generator.create_pie_chart(data_dict, title)
-        if fig:
-            canvas = FigureCanvas(fig)
-            canvas.setStyleSheet("background-color: #FFFFFF;")
-            
-            # ✅ 根据 figure 尺寸设置 canvas 大小
-            fig_width, fig_height = fig.get_size_inches()
-            dpi = fig.get_dpi()
-            canvas.setFixedSize(int(fig_width * dpi), int(fig_height * dpi))
-            
-            self.chart_layout.addWidget(canvas)
+        self.display_chart(data_dict, title)
+
+    def chart_request(self, mode, current_date, stat_date):
+        """某一天 / 统计周期的图表数据（小时）和标题"""
+        if mode == "day":
+            raw_data = self.data_manager.get_day_data(current_date)
+            title = f"{current_date} 精力分配"
+        else:
+            start_date, end_date, period_str = self.get_stat_period_range(mode, stat_date)
+            raw_data = self.aggregate_data(start_date, end_date)
+            title = f"{period_str} 精力分配"
+
+        if raw_data:
+            data_dict = {k: v / 60 for k, v in raw_data.items()}
+        else:
+            data_dict = {}
+        return data_dict, title
+
+    def prefetch_neighbours(self):
+        """预取前后相邻的一天（当天模式）或统计周期的数据，并在后台渲染图表"""
+        if self.stat_mode == "day":
+            current = datetime.strptime(self.current_date, '%Y.%m.%d')
+            states = [((current + timedelta(days=step)).strftime('%Y.%m.%d'), self.stat_date)
+                      for step in (1, -1)]
+        else:
+            states = [(self.current_date, self.shift_stat_period(self.stat_date, step))
+                      for step in (1, -1)]
+
+        requests = []
+        for current_date, stat_date in states:
+            data_dict, title = self.chart_request(self.stat_mode, current_date, stat_date)
+            if data_dict and sum(data_dict.values()) > 0:
+                requests.append((data_dict, title))
+        self.chart_renderer.prefetch(requests, self.devicePixelRatioF())
 
+    def prefetch_stats(self):
+        """图表请求的缓存命中率与预取统计"""
+        return self.chart_renderer.stats()
 
     def aggregate_data(self, start_date, end_date):
         """汇总日期范围内的数据"""
-        aggregated_data = {}
-        current = start_date
-        
-        while current <= end_date:
-            date_str = current.strftime('%Y.%m.%d')
-            day_data = self.data_manager.get_day_data(date_str)
-            
-            if day_data:
-                for category, minutes in day_data.items():
-                    aggregated_data[category] = aggregated_data.get(category, 0) + minutes
-            
-            current += timedelta(days=1)
-        
-        return aggregated_data
+        return self.data_manager.aggregate_range(start_date, end_date)
 
     def save_data(self):
         data_dict = {}
@@ -926,6 +923,7 @@ class DetailViewQt(QWidget):
                     data_dict[category] = minutes
 
         if self.data_manager.save_day_data(self.current_date, data_dict):
+            self.chart_generator.invalidate_cache()
             QMessageBox.information(self, "成功", "✅ 数据已保存")
             self.load_data()
         else:
@@ -936,6 +934,7 @@ class DetailViewQt(QWidget):
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
             if self.data_manager.delete_day_data(self.current_date):
+                self.chart_generator.invalidate_cache()
                 QMessageBox.information(self, "成功", "✅ 数据已删除")
                 for entry in self.entries.values():
                     entry.setText("0")
@@ -947,43 +946,35 @@ class DetailViewQt(QWidget):
         self.load_data()
 
     def parse_time(self, time_str):
-        time_str = time_str.strip()
-        if 'h' in time_str or 'm' in time_str:
-            hours, minutes = 0, 0
-            matches = re.findall(r'(\d+\.?\d*)([hm])', time_str, re.IGNORECASE)
-            for value, unit in matches:
-                if unit.lower() == 'h':
-                    hours = float(value)
-                elif unit.lower() == 'm':
-                    minutes = float(value)
-            return int(hours * 60 + minutes)
-        try:
-            return int(float(time_str) * 60)
-        except:
-            return 0
+        return parse_duration(time_str)
 
     def display_chart(self, data_dict, title):
-        """显示图表"""
-        while self.chart_layout.count():
-            item = self.chart_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        """显示图表：缓存命中时立即显示，否则在后台渲染完成后显示"""
+        self.chart_renderer.request(data_dict, title, self.devicePixelRatioF())
 
-        try:
-            fig = self.chart_generator.create_pie_chart(data_dict, title)
-            canvas = FigureCanvas(fig)
-            canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            self.chart_layout.addWidget(canvas, alignment=Qt.AlignCenter)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"生成图表失败: {e}")
+    def show_chart_image(self, image):
+        """显示渲染好的图表图像（QImage 已带屏幕像素比）"""
+        if image is None:
+            self.display_empty_chart()
+            return
 
-    def display_empty_chart(self):
-        while self.chart_layout.count():
-            item = self.chart_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        ratio = image.devicePixelRatio()
+        self.chart_label.setPixmap(QPixmap.fromImage(image))
+        # ✅ 根据图像尺寸设置显示大小
+        self.chart_label.setFixedSize(int(image.width() / ratio), int(image.height() / ratio))
+        self.empty_chart_widget.hide()
+        self.chart_label.show()
+        self.chart_displayed.emit()
 
-        # 空数据提示
+    def display_empty_chart(self):
+        # 后台尚未完成的渲染已过期
+        self.chart_renderer.cancel()
+        self.chart_label.hide()
+        self.empty_chart_widget.show()
+        self.chart_displayed.emit()
+
+    def create_empty_chart_widget(self):
+        """空数据提示"""
         empty_widget = QWidget()
         empty_widget.setStyleSheet("background: transparent;")
         empty_layout = QVBoxLayout(empty_widget)
@@ -1008,7 +999,7 @@ class DetailViewQt(QWidget):
         hint_label.setAlignment(Qt.AlignCenter)
         empty_layout.addWidget(hint_label)
 
-        self.chart_layout.addWidget(empty_widget, alignment=Qt.AlignCenter)
+        return empty_widget
 
     def add_category(self):
         text, ok = QInputDialog.getText(self, "添加分类", "请输入新分类名称:")
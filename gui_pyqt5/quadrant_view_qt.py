@@ -4,152 +4,238 @@ PyQt5 版本 - 四象限任务管理视图（完整优化版）
 """
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QLineEdit, QPushButton, QFrame, QListWidget,
-                             QListWidgetItem, QMenu, QGridLayout,
+                             QLineEdit, QPushButton, QFrame, QListView,
+                             QStyledItemDelegate, QMenu, QGridLayout,
                              QSizePolicy, QGraphicsDropShadowEffect, QScrollArea)
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import (Qt, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QEvent, QRect, QSize)
+from PyQt5.QtGui import QFont, QColor, QPainter
 
+from core.data_manager import (TASK_INSERTED, TASK_REMOVED, TASK_UPDATED,
+                               TASK_MOVED, TASK_RESET)
 
-class TaskItemWidget(QWidget):
-    """自定义任务项组件，包含任务文本和操作按钮"""
+
+# 模型中的自定义数据角色
+TASK_ID_ROLE = Qt.UserRole
+COMPLETED_ROLE = Qt.UserRole + 1
+
+# 任务行的尺寸（所有行等高，列表视图只为可见行计算布局和绘制）
+ROW_HEIGHT = 60
+BUTTON_SIZE = 32
+BUTTON_SPACING = 10
+ROW_MARGIN = 10
+
+
+class TaskListModel(QAbstractListModel):
+    """单个象限的任务列表模型，数据直接取自 DataManager 的任务索引"""
+
+    def __init__(self, data_manager, quadrant_id, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.quadrant_id = quadrant_id
+        self._tasks = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._tasks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._tasks):
+            return None
+        task = self._tasks[index.row()]
+        if role == Qt.DisplayRole:
+            return task.get('text', '')
+        if role == TASK_ID_ROLE:
+            return task['id']
+        if role == COMPLETED_ROLE:
+            return task.get('completed', False)
+        return None
+
+    def task_id_at(self, row):
+        """某一行的任务 id"""
+        return self._tasks[row]['id']
+
+    def task_ids(self):
+        """按显示顺序排列的任务 id"""
+        return [task['id'] for task in self._tasks]
+
+    def refresh(self):
+        """从 DataManager 重新读取本象限的任务"""
+        self.beginResetModel()
+        self._tasks = self.data_manager.get_tasks(self.quadrant_id)
+        self.endResetModel()
+
+    # ==================== 增量更新 ====================
+    # 行号来自 DataManager 的任务事件；与模型当前内容对不上时退回整体刷新
+
+    def _has_row(self, row, task_id):
+        return row is not None and 0 <= row < len(self._tasks) and self._tasks[row]['id'] == task_id
+
+    def insert_task(self, row, task):
+        """在 row 处插入任务"""
+        if row is None or not 0 <= row <= len(self._tasks):
+            self.refresh()
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.insert(row, task)
+        self.endInsertRows()
+
+    def remove_task(self, row, task_id):
+        """移除 row 处的任务"""
+        if not self._has_row(row, task_id):
+            self.refresh()
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._tasks[row]
+        self.endRemoveRows()
+
+    def update_task(self, row, task):
+        """row 处的任务内容已修改，只重绘该行"""
+        if not self._has_row(row, task['id']):
+            self.refresh()
+            return
+        self._tasks[row] = task
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def move_task(self, old_row, new_row, task_id):
+        """把 old_row 处的任务移到 new_row（移动后的行号）"""
+        if not self._has_row(old_row, task_id) or not 0 <= new_row < len(self._tasks):
+            self.refresh()
+            return
+        if old_row == new_row:
+            return
+        # beginMoveRows 的目标位置以移动前的行号计
+        destination = new_row + 1 if new_row > old_row else new_row
+        self.beginMoveRows(QModelIndex(), old_row, old_row, QModelIndex(), destination)
+        self._tasks.insert(new_row, self._tasks.pop(old_row))
+        self.endMoveRows()
+
+
+class TaskItemDelegate(QStyledItemDelegate):
+    """任务行绘制与点击处理：文本 + 上移 / 下移 / 删除按钮，均直接绘制，不创建子组件"""
 
     task_clicked = pyqtSignal(str)      # task_id
     delete_clicked = pyqtSignal(str)    # task_id
     move_up_clicked = pyqtSignal(str)   # task_id
     move_down_clicked = pyqtSignal(str) # task_id
 
-    def __init__(self, task_id, task_text, is_completed, color, parent=None):
+    # 按钮从左到右的顺序：(名称, 文字, 颜色为 None 时使用象限颜色)
+    BUTTONS = (
+        ('up', '↑', None),
+        ('down', '↓', None),
+        ('delete', '✕', '#CC3333'),
+    )
+
+    def __init__(self, color, parent=None):
         super().__init__(parent)
-        self.task_id = task_id
-        self.task_text = task_text
-        self.is_completed = is_completed
         self.color = color
-
-        self.init_ui()
-
-    def init_ui(self):
-        """初始化UI"""
-        self.setMinimumHeight(50)
-        self.setStyleSheet("background-color: transparent; border: none;")
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(10, 0, 10, 8)
-        layout.setSpacing(10)
-        layout.setAlignment(Qt.AlignVCenter)
-
-        # 任务文本标签
-        self.task_label = QLabel()
-        self.update_label()
-        self.task_label.setCursor(Qt.PointingHandCursor)
-        self.task_label.setAlignment(Qt.AlignVCenter)
-        layout.addWidget(self.task_label, 1)
-
-        # 上移按钮
-        up_btn = QPushButton("↑")
-        up_btn.setFixedSize(32, 32)
-        up_btn.setFont(QFont("Heiti TC", 14, QFont.Bold))
-        up_btn.setCursor(Qt.PointingHandCursor)
-        up_btn.setToolTip("上移")
-        up_btn.clicked.connect(lambda: self.move_up_clicked.emit(self.task_id))
-        up_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: transparent;
-                color: {self.color};
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.color};
-                color: white;
-                border: none;
-            }}
-            QPushButton:pressed {{
-                padding-top: 1px;
-            }}
-        """)
-        layout.addWidget(up_btn)
-
-        # 下移按钮
-        down_btn = QPushButton("↓")
-        down_btn.setFixedSize(32, 32)
-        down_btn.setFont(QFont("Heiti TC", 14, QFont.Bold))
-        down_btn.setCursor(Qt.PointingHandCursor)
-        down_btn.setToolTip("下移")
-        down_btn.clicked.connect(lambda: self.move_down_clicked.emit(self.task_id))
-        down_btn.setStyleSheet(f"""
-            QPushButton {{
-                background-color: transparent;
-                color: {self.color};
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {self.color};
-                color: white;
-                border: none;
-            }}
-            QPushButton:pressed {{
-                padding-top: 1px;
-            }}
-        """)
-        layout.addWidget(down_btn)
-
-        # 删除按钮
-        del_btn = QPushButton("✕")
-        del_btn.setFixedSize(32, 32)
-        del_btn.setFont(QFont("Heiti TC", 14, QFont.Bold))
-        del_btn.setCursor(Qt.PointingHandCursor)
-        del_btn.setToolTip("删除")
-        del_btn.clicked.connect(lambda: self.delete_clicked.emit(self.task_id))
-        del_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: #C33;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #C33;
-                color: white;
-                border: none;
-            }
-            QPushButton:pressed {
-                padding-top: 1px;
-            }
-        """)
-        layout.addWidget(del_btn)
-
-        # 连接任务文本点击事件
-        self.task_label.mousePressEvent = self.on_task_text_clicked
-
-    def update_label(self):
-        """更新任务文本标签"""
-        if self.is_completed:
-            text = f"✅ {self.task_text}"
-            color = '#A0AEC0'
-            font = QFont("Heiti TC", 13)
-            font.setItalic(True)
+        self.text_font = QFont("Heiti TC", 13)
+        self.completed_font = QFont("Heiti TC", 13)
+        self.completed_font.setItalic(True)
+        self.button_font = QFont("Heiti TC", 14, QFont.Bold)
+        # 鼠标悬停位置：(行号, 区域名)
+        self._hover = None
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), ROW_HEIGHT)
+
+    def _button_rects(self, rect):
+        """按钮区域，从右向左排列"""
+        rects = {}
+        right = rect.right() - ROW_MARGIN
+        top = rect.top() + (rect.height() - BUTTON_SIZE) // 2
+        for name, _, _ in reversed(self.BUTTONS):
+            rects[name] = QRect(right - BUTTON_SIZE + 1, top, BUTTON_SIZE, BUTTON_SIZE)
+            right -= BUTTON_SIZE + BUTTON_SPACING
+        return rects
+
+    def _text_rect(self, rect):
+        buttons_width = len(self.BUTTONS) * (BUTTON_SIZE + BUTTON_SPACING)
+        return rect.adjusted(ROW_MARGIN, 0, -(ROW_MARGIN + buttons_width), 0)
+
+    def _hit_test(self, rect, pos):
+        """鼠标位置对应的区域：按钮名、'text' 或 None"""
+        for name, button_rect in self._button_rects(rect).items():
+            if button_rect.contains(pos):
+                return name
+        if self._text_rect(rect).contains(pos):
+            return 'text'
+        return None
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+
+        rect = option.rect
+        hover = self._hover[1] if self._hover and self._hover[0] == index.row() else None
+
+        # 任务文本
+        if index.data(COMPLETED_ROLE):
+            text = f"✅ {index.data(Qt.DisplayRole)}"
+            painter.setFont(self.completed_font)
+            painter.setPen(QColor('#A0AEC0'))
         else:
-            text = f"⬜ {self.task_text}"
-            color = self.color
-            font = QFont("Heiti TC", 13)
-
-        self.task_label.setText(text)
-        self.task_label.setFont(font)
-        self.task_label.setStyleSheet(f"color: {color}; background-color: transparent; border: none;")
-
-    def on_task_text_clicked(self, event):
-        """处理任务文本点击事件"""
-        self.task_clicked.emit(self.task_id)
-
-    def set_completed(self, is_completed):
-        """更新完成状态"""
-        self.is_completed = is_completed
-        self.update_label()
-
+            text = f"⬜ {index.data(Qt.DisplayRole)}"
+            painter.setFont(self.text_font)
+            painter.setPen(QColor(self.color))
+        text_rect = self._text_rect(rect)
+        text = painter.fontMetrics().elidedText(text, Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, text)
+
+        # 按钮：悬停时填充底色、文字变白
+        painter.setFont(self.button_font)
+        button_rects = self._button_rects(rect)
+        for name, label, button_color in self.BUTTONS:
+            button_rect = button_rects[name]
+            color = QColor(button_color or self.color)
+            if hover == name:
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(color)
+                painter.drawRoundedRect(button_rect, 5, 5)
+                painter.setPen(QColor('white'))
+            else:
+                painter.setPen(color)
+            painter.drawText(button_rect, Qt.AlignCenter, label)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove:
+            self._set_hover((index.row(), self._hit_test(option.rect, event.pos())))
+            return False
+
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            task_id = index.data(TASK_ID_ROLE)
+            target = self._hit_test(option.rect, event.pos())
+            if target == 'text':
+                self.task_clicked.emit(task_id)
+            elif target == 'up':
+                self.move_up_clicked.emit(task_id)
+            elif target == 'down':
+                self.move_down_clicked.emit(task_id)
+            elif target == 'delete':
+                self.delete_clicked.emit(task_id)
+            return target is not None
+        return False
+
+    def eventFilter(self, obj, event):
+        """安装在列表视口上：鼠标离开时清除悬停状态"""
+        if event.type() == QEvent.Leave:
+            self._set_hover(None)
+        return False
+
+    def _set_hover(self, hover):
+        if hover == self._hover:
+            return
+        self._hover = hover
+        view = self.parent()
+        if view is not None:
+            clickable = hover is not None and hover[1] is not None
+            view.viewport().setCursor(Qt.PointingHandCursor if clickable else Qt.ArrowCursor)
+            view.viewport().update()
 
 
 class QuadrantViewQt(QWidget):
@@ -165,8 +251,12 @@ class QuadrantViewQt(QWidget):
             'Q4': {'name': '不重要不紧急', 'color': '#718096', 'bg': '#F7FAFC', 'icon': '💤', 'desc': '尽量避免'}
         }
         self.task_lists = {}
+        self.task_models = {}
         self.init_ui()
 
+        # 任务修改后由 DataManager 通知，只更新受影响的行
+        self.data_manager.add_task_listener(self.on_task_event)
+
     def add_shadow(self, widget, blur=20, offset=3, color=QColor(0, 0, 0, 40)):
         """为组件添加阴影效果"""
         shadow = QGraphicsDropShadowEffect()
@@ -314,36 +404,46 @@ class QuadrantViewQt(QWidget):
         input_layout.addWidget(add_btn)
         layout.addLayout(input_layout)
 
-        # 任务列表
-        task_list = QListWidget()
+        # 任务列表：模型 + 委托绘制，只有可见行会被绘制
+        task_list = QListView()
         task_list.setMinimumHeight(200)
+        task_list.setUniformItemSizes(True)
+        task_list.setMouseTracking(True)
+        task_list.setSelectionMode(QListView.NoSelection)
+        task_list.setVerticalScrollMode(QListView.ScrollPerPixel)
         task_list.setStyleSheet(f"""
-            QListWidget {{
+            QListView {{
                 background-color: #FAFBFC;
                 border: 1px solid #E2E8F0;
                 border-radius: 12px;
                 padding: 12px;
                 outline: none;
             }}
-            QListWidget::item {{
-                padding: 4px 0px;
-                margin: 5px 0px;
-                background-color: transparent;
-                border: none;
-            }}
-            QListWidget::item:selected {{
-                background-color: transparent;
-                border: none;
-            }}
-            QListWidget::item:hover {{
-                background-color: transparent;
-                border: none;
-            }}
         """)
+
+        model = TaskListModel(self.data_manager, quadrant_id, task_list)
+        delegate = TaskItemDelegate(color, task_list)
+        task_list.setModel(model)
+        task_list.setItemDelegate(delegate)
+        task_list.viewport().installEventFilter(delegate)
+
+        delegate.task_clicked.connect(
+            lambda task_id: self.on_task_completed_toggled(task_id, quadrant_id)
+        )
+        delegate.delete_clicked.connect(
+            lambda task_id: self.on_task_deleted(task_id, quadrant_id)
+        )
+        delegate.move_up_clicked.connect(
+            lambda task_id: self.on_task_moved_up(task_id, quadrant_id)
+        )
+        delegate.move_down_clicked.connect(
+            lambda task_id: self.on_task_moved_down(task_id, quadrant_id)
+        )
         layout.addWidget(task_list, 1)
 
         # 存储引用
         self.task_lists[quadrant_id] = task_list
+        self.task_models[quadrant_id] = model
 
         # ========== 添加任务功能 ==========
         def add_task():
@@ -355,7 +455,6 @@ class QuadrantViewQt(QWidget):
 
                 if task_id:
                     input_field.clear()
-                    self.refresh_task_list(quadrant_id)
 
         add_btn.clicked.connect(add_task)
         input_field.returnPressed.connect(add_task)
@@ -376,110 +475,75 @@ class QuadrantViewQt(QWidget):
 
     def refresh_task_list(self, quadrant_id):
         """刷新任务列表"""
-        task_list = self.task_lists.get(quadrant_id)
+        model = self.task_models.get(quadrant_id)
 
-        if task_list is None:
+        if model is None:
             return
 
-        task_list.clear()
-
-        tasks = self.data_manager.get_tasks(quadrant_id)
-
-        # 获取象限颜色信息
-        quadrant_info = self.quadrants.get(quadrant_id, {})
-        color = quadrant_info.get('color', '#667EEA')
-
-        for task in tasks:
-            # 创建自定义任务项组件
-            task_widget = TaskItemWidget(
-                task['id'],
-                task['text'],
-                task.get('completed', False),
-                color
-            )
-
-            # 连接信号
-            task_widget.task_clicked.connect(
-                lambda task_id: self.on_task_completed_toggled(task_id, quadrant_id)
-            )
-            task_widget.delete_clicked.connect(
-                lambda task_id: self.on_task_deleted(task_id, quadrant_id)
-            )
-            task_widget.move_up_clicked.connect(
-                lambda task_id: self.on_task_moved_up(task_id, quadrant_id)
-            )
-            task_widget.move_down_clicked.connect(
-                lambda task_id: self.on_task_moved_down(task_id, quadrant_id)
-            )
-
-            # 创建列表项并设置自定义组件
-            item = QListWidgetItem(task_list)
-            item.setData(Qt.UserRole, task['id'])
-            item.setSizeHint(task_widget.sizeHint())
-            task_list.setItemWidget(item, task_widget)
+        model.refresh()
+
+    def on_task_event(self, event):
+        """DataManager 任务变化事件：只更新来源和目标象限中受影响的行"""
+        if event.kind == TASK_RESET:
+            for model in self.task_models.values():
+                model.refresh()
+            return
 
+        model = self.task_models.get(event.quadrant)
+        if event.kind == TASK_INSERTED:
+            if model is not None:
+                model.insert_task(event.row, event.task)
+        elif event.kind == TASK_REMOVED:
+            if model is not None:
+                model.remove_task(event.row, event.task_id)
+        elif event.kind == TASK_UPDATED:
+            if model is not None:
+                model.update_task(event.row, event.task)
+        elif event.kind == TASK_MOVED:
+            if event.old_quadrant == event.quadrant:
+                if model is not None:
+                    model.move_task(event.old_row, event.row, event.task_id)
+                return
+            old_model = self.task_models.get(event.old_quadrant)
+            if old_model is not None:
+                old_model.remove_task(event.old_row, event.task_id)
+            if model is not None:
+                model.insert_task(event.row, event.task)
 
     def on_task_completed_toggled(self, task_id, quadrant_id):
         """处理任务完成状态切换"""
         self.data_manager.toggle_task_completed(task_id)
-        self.refresh_task_list(quadrant_id)
 
     def on_task_deleted(self, task_id, quadrant_id):
         """处理任务删除"""
         self.data_manager.delete_task(task_id)
-        self.refresh_task_list(quadrant_id)
 
     def on_task_moved_up(self, task_id, quadrant_id):
         """处理任务上移"""
-        tasks = self.data_manager.get_tasks(quadrant_id)
-        current_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
+        task_ids = self.task_models[quadrant_id].task_ids()
+        current_index = task_ids.index(task_id) if task_id in task_ids else None
 
         if current_index is not None and current_index > 0:
-            # 交换位置
-            tasks[current_index], tasks[current_index - 1] = tasks[current_index - 1], tasks[current_index]
-
-            # 保存重新排序后的任务列表
-            data = self.data_manager._load_quadrant_tasks()
-            quadrant_task_indices = [i for i, t in enumerate(data['tasks']) if t.get('quadrant') == quadrant_id]
-
-            for new_idx, task in enumerate(tasks):
-                old_idx = quadrant_task_indices[new_idx]
-                data['tasks'][old_idx] = task
-
-            self.data_manager._save_quadrant_tasks(data)
-            self.refresh_task_list(quadrant_id)
+            # 放到上一个任务之前，只改写本任务的排序键
+            self.data_manager.reorder_task(task_id, after_id=task_ids[current_index - 1])
 
     def on_task_moved_down(self, task_id, quadrant_id):
         """处理任务下移"""
-        tasks = self.data_manager.get_tasks(quadrant_id)
-        current_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
-
-        if current_index is not None and current_index < len(tasks) - 1:
-            # 交换位置
-            tasks[current_index], tasks[current_index + 1] = tasks[current_index + 1], tasks[current_index]
-
-            # 保存重新排序后的任务列表
-            data = self.data_manager._load_quadrant_tasks()
-            quadrant_task_indices = [i for i, t in enumerate(data['tasks']) if t.get('quadrant') == quadrant_id]
-
-            for new_idx, task in enumerate(tasks):
-                old_idx = quadrant_task_indices[new_idx]
-                data['tasks'][old_idx] = task
-
-            self.data_manager._save_quadrant_tasks(data)
-            self.refresh_task_list(quadrant_id)
-
+        task_ids = self.task_models[quadrant_id].task_ids()
+        current_index = task_ids.index(task_id) if task_id in task_ids else None
 
+        if current_index is not None and current_index < len(task_ids) - 1:
+            # 放到下一个任务之后，只改写本任务的排序键
+            self.data_manager.reorder_task(task_id, before_id=task_ids[current_index + 1])
 
     def show_context_menu(self, position, quadrant_id, task_list):
         """显示右键菜单"""
-        item = task_list.itemAt(position)
-        if not item:
+        index = task_list.indexAt(position)
+        if not index.isValid():
             return
 
-        task_id = item.data(Qt.UserRole)
-        tasks = self.data_manager.get_tasks(quadrant_id)
-        task = next((t for t in tasks if t['id'] == task_id), None)
+        task_id = index.data(TASK_ID_ROLE)
+        task = self.data_manager.get_task(task_id)
 
         if not task:
             return
@@ -549,12 +613,7 @@ class QuadrantViewQt(QWidget):
 
         if action == toggle_action:
             self.data_manager.toggle_task_completed(task_id)
-            self.refresh_task_list(quadrant_id)
         elif action == delete_action:
             self.data_manager.delete_task(task_id)
-            self.refresh_task_list(quadrant_id)
         elif action and action.data():
-            new_quadrant = action.data()
-            self.data_manager.move_task(task_id, new_quadrant)
-            self.refresh_task_list(quadrant_id)
-            self.refresh_task_list(new_quadrant)
+            self.data_manager.move_task(task_id, action.data())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+精力管理系统 - 命令行批量导入
+把其他时间记录工具导出的 CSV / JSONL（每行：日期、分类、时长）流式导入数据目录，
+分批提交，未知分类自动加入分类列表，结束时输出吞吐量（行/秒）。
+
+用法:
+    python import_cli.py toggl_export.csv
+    python import_cli.py 历史记录.jsonl --data-dir 数据目录 --columns day,tag,hours --merge
+"""
+
+import argparse
+import os
+import sys
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.data_manager import DataManager, get_app_data_dir
+from core.importer import import_file, DEFAULT_COLUMNS, BATCH_ROWS
+
+
+IMPORT_BACKENDS = ('json', 'journal', 'sqlite', 'sharded', 'binary')
+
+
+def parse_columns(text):
+    columns = tuple(c.strip() for c in text.split(','))
+    if len(columns) != 3 or not all(columns):
+        raise argparse.ArgumentTypeError("列名格式为 日期列,分类列,时长列")
+    return columns
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="批量导入时间记录（CSV / JSONL）")
+    parser.add_argument('files', nargs='+', metavar='文件', help=".csv / .tsv / .jsonl 文件")
+    parser.add_argument('--data-dir', default=None, help="数据目录，默认为应用数据目录")
+    parser.add_argument('--backend', choices=IMPORT_BACKENDS, default='json',
+                        help="存储后端（默认 json）")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default=None,
+                        help="文件格式，默认按扩展名判断")
+    parser.add_argument('--columns', type=parse_columns, default=DEFAULT_COLUMNS,
+                        help="日期、分类、时长的列名，逗号分隔（默认 date,category,duration）")
+    parser.add_argument('--merge', action='store_true',
+                        help="与应用中已有的当天数据相加（默认替换文件中出现的日期）")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f"每批提交的行数（默认 {BATCH_ROWS}）")
+    return parser
+
+
+def print_progress(stats):
+    print(f"  已读取 {stats.rows} 行，{stats.rows_per_second:,.0f} 行/秒", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data_dir = args.data_dir or get_app_data_dir()
+
+    data_manager = DataManager(data_dir=data_dir, backend=args.backend)
+    # 多个文件共用：后面的文件与前面文件写入的同一天相加，不会互相替换
+    seen_days = set()
+    try:
+        for path in args.files:
+            print(f"导入 {path}")
+            try:
+                stats = import_file(data_manager, path, fmt=args.format, columns=args.columns,
+                                    merge=args.merge, batch_rows=max(1, args.batch_rows),
+                                    progress=print_progress, seen_days=seen_days)
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"导入失败: {e}", file=sys.stderr)
+                return 1
+            print(stats.summary())
+            for line_no, message in stats.errors:
+                print(f"  第 {line_no} 行: {message}")
+    finally:
+        data_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,9 @@
 主应用入口 - 下拉菜单导航
 """
 
+import time
+START_TIME = time.perf_counter()
+
 import sys
 import os
 
@@ -15,24 +18,63 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QStackedWidget, QPushButton, QMenu,
                              QLabel, QGraphicsDropShadowEffect, QFrame)
 from PyQt5.QtGui import QFont, QColor, QCursor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QEvent, QTimer
 
 from core.data_manager import DataManager
-from core.chart_generator import ChartGenerator
-from gui_pyqt5.detail_view_qt import DetailViewQt
-from gui_pyqt5.quadrant_view_qt import QuadrantViewQt
+from core.chart_generator import ChartGenerator, load_times
 from gui_pyqt5.styles import LIGHT_STYLE
 
 
+# 数据修改后空闲多久（毫秒）写入磁盘
+WRITE_BEHIND_MS = 500
+
+
+class StartupProfiler(QObject):
+    """--profile-startup：记录启动各阶段结束的时间点，首张图表显示后打印耗时分解"""
+
+    def __init__(self, start_time):
+        super().__init__()
+        self.start_time = start_time
+        self.marks = []
+        self.painted = False
+        self.reported = False
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def watch_first_paint(self, widget):
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.painted:
+            self.painted = True
+            self.mark("首次绘制")
+            obj.removeEventFilter(self)
+        return False
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        print("启动耗时（阶段 / 阶段耗时 / 累计）:")
+        last = self.start_time
+        for phase, t in self.marks:
+            print(f"  {phase:<24}{(t - last) * 1000:8.1f} ms{(t - self.start_time) * 1000:10.1f} ms")
+            last = t
+        for phase, seconds in load_times().items():
+            print(f"    其中 matplotlib {phase}: {seconds * 1000:.1f} ms（图表线程）")
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler
         self.setWindowTitle("精力管理系统")
         self.setGeometry(50, 50, 1500, 950)
         self.setMinimumSize(1300, 850)
 
-        # 初始化管理器
-        self.data_manager = DataManager()
+        # 初始化管理器（延迟写入：修改先更新内存，空闲后在后台落盘）
+        self.data_manager = DataManager(write_behind_ms=WRITE_BEHIND_MS)
         self.chart_generator = ChartGenerator()
 
         # 页面配置
@@ -56,17 +98,17 @@ class MainWindow(QMainWindow):
         self.nav_bar = self.create_nav_bar()
         main_layout.addWidget(self.nav_bar)
 
-        # 页面容器
+        # 页面容器：先放空白占位，第一次切换到某页时才创建对应视图
         self.stack = QStackedWidget()
         main_layout.addWidget(self.stack, 1)
+        self.detail_view = None
+        self.quadrant_view = None
+        self.page_views = [None] * len(self.pages)
+        for _ in self.pages:
+            self.stack.addWidget(QWidget())
 
-        # 创建视图
-        self.detail_view = DetailViewQt(self.data_manager, self.chart_generator)
-        self.quadrant_view = QuadrantViewQt(self.data_manager)
-
-        # 添加到堆栈
-        self.stack.addWidget(self.detail_view)
-        self.stack.addWidget(self.quadrant_view)
+        # 窗口第一次绘制之后再创建首页（数据与图表在首页创建后异步加载）
+        central_widget.installEventFilter(self)
 
     def create_nav_bar(self):
         """创建顶部导航栏"""
@@ -179,8 +221,50 @@ class MainWindow(QMainWindow):
         page = self.pages[self.current_page_index]
         self.nav_button.setText(f"{page['icon']}  {page['name']}  ▾")
 
+    def eventFilter(self, obj, event):
+        if obj is self.centralWidget() and event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, lambda: self.switch_page(self.current_page_index))
+        return super().eventFilter(obj, event)
+
+    def create_page(self, page_id):
+        """创建页面视图（视图模块在此时才导入）"""
+        if page_id == "energy":
+            from gui_pyqt5.detail_view_qt import DetailViewQt
+
+            self.detail_view = DetailViewQt(self.data_manager, self.chart_generator)
+            if self.profiler:
+                self.detail_view.chart_displayed.connect(self.on_first_chart)
+            return self.detail_view
+        if page_id == "quadrant":
+            from gui_pyqt5.quadrant_view_qt import QuadrantViewQt
+
+            self.quadrant_view = QuadrantViewQt(self.data_manager)
+            return self.quadrant_view
+        raise ValueError(f"未知的页面: {page_id}")
+
+    def ensure_page(self, index):
+        """确保第 index 页已创建，替换掉占位 widget"""
+        if self.page_views[index] is not None:
+            return
+        view = self.create_page(self.pages[index]["id"])
+        placeholder = self.stack.widget(index)
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.stack.insertWidget(index, view)
+        self.page_views[index] = view
+        if self.profiler:
+            self.profiler.mark(f"创建页面 {self.pages[index]['id']}")
+
+    def on_first_chart(self):
+        """--profile-startup：首张图表显示后打印耗时"""
+        self.detail_view.chart_displayed.disconnect(self.on_first_chart)
+        self.profiler.mark("首张图表")
+        self.profiler.report()
+
     def switch_page(self, index):
         """切换页面"""
+        self.ensure_page(index)
         self.current_page_index = index
         self.stack.setCurrentIndex(index)
         self.update_nav_button_text()
@@ -189,8 +273,22 @@ class MainWindow(QMainWindow):
         for i, action in enumerate(self.nav_menu.actions()):
             action.setChecked(i == index)
 
+    def closeEvent(self, event):
+        """关闭窗口前等待后台图表渲染结束，并把延迟写入的数据落盘"""
+        if self.detail_view is not None:
+            self.detail_view.chart_renderer.wait()
+        self.data_manager.close()
+        super().closeEvent(event)
+
 
 def main():
+    # --profile-startup：打印启动到首张图表显示的各阶段耗时
+    profiler = None
+    if '--profile-startup' in sys.argv:
+        sys.argv.remove('--profile-startup')
+        profiler = StartupProfiler(START_TIME)
+        profiler.mark("导入模块")
+
     # 启用高DPI支持
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
@@ -210,7 +308,13 @@ def main():
         # 使用系统默认字体
         app.setFont(QFont("", 11))
 
-    window = MainWindow()
+    if profiler:
+        profiler.mark("创建 QApplication")
+
+    window = MainWindow(profiler)
+    if profiler:
+        profiler.mark("创建主窗口")
+        profiler.watch_first_paint(window.nav_bar)
     window.show()
 
     sys.exit(app.exec_())
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+精力管理系统 - 命令行批量报表
+不依赖 Qt：读取一个或多个数据目录，把日期范围内每天 / 每周 / 每月的饼图导出为 PNG 或 SVG，
+绘制工作分给多个进程并行完成，结束时输出吞吐量（张/秒）。
+
+用法:
+    python report_cli.py --start 2025.01.01 --end 2025.12.31
+    python report_cli.py 数据目录A 数据目录B --periods week,month --format svg --workers 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from core.data_manager import DataManager, get_app_data_dir
+from core.periods import period_range, iter_periods
+from core.storage import find_data_file
+
+
+REPORT_PERIODS = ('day', 'week', 'month')
+REPORT_FORMATS = ('png', 'svg')
+
+# 每个工作进程复用一个 ChartGenerator（及其 Figure）
+_chart_generator = None
+_dpi = 100
+
+
+def period_key(mode, day):
+    """导出文件名：2025-03-07 / 2025-W10 / 2025-03"""
+    if mode == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    elif mode == "month":
+        return day.strftime('%Y-%m')
+    return day.strftime('%Y-%m-%d')
+
+
+def collect_jobs(data_manager, start, end, periods, out_dir, fmt):
+    """在主进程中汇总每个周期的数据，返回 [(数据, 标题, 输出路径), ...]，跳过没有记录的周期
+
+    数据与标题和详情页图表一致（分钟换算为小时）。
+    """
+    jobs = []
+    for mode in periods:
+        mode_dir = os.path.join(out_dir, mode)
+        for day in iter_periods(mode, start, end):
+            first_day, last_day, period_str = period_range(mode, day)
+            if mode == "day":
+                raw_data = data_manager.get_day_data(period_str)
+            else:
+                raw_data = data_manager.aggregate_range(first_day, last_day)
+            if not raw_data or sum(raw_data.values()) == 0:
+                continue
+            data_dict = {k: v / 60 for k, v in raw_data.items()}
+            title = f"{period_str} 精力分配"
+            path = os.path.join(mode_dir, f"{period_key(mode, day)}.{fmt}")
+            jobs.append((data_dict, title, path))
+    return jobs
+
+
+def _init_worker(dpi):
+    """工作进程初始化：各自加载 matplotlib 与字体"""
+    global _chart_generator, _dpi
+    from core.chart_generator import ChartGenerator
+
+    _chart_generator = ChartGenerator(cache_bytes=0)
+    _dpi = dpi
+
+
+def _render_job(job):
+    data_dict, title, path = job
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return _chart_generator.save_pie_chart(data_dict, path, title, dpi=_dpi)
+
+
+def render_jobs(jobs, workers, dpi):
+    """渲染全部图表，返回成功导出的张数"""
+    if workers <= 1:
+        _init_worker(dpi)
+        return sum(1 for job in jobs if _render_job(job))
+
+    # 每个进程一次领取一批任务，减少进程间通信次数
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(dpi,)) as pool:
+        return sum(1 for ok in pool.imap_unordered(_render_job, jobs, chunksize) if ok)
+
+
+def output_names(data_dirs):
+    """每个数据目录的输出子目录名（目录名重复时追加序号）"""
+    names = []
+    for data_dir in data_dirs:
+        base = os.path.basename(os.path.normpath(data_dir)) or 'data'
+        name, n = base, 2
+        while name in names:
+            name, n = f"{base}-{n}", n + 1
+        names.append(name)
+    return names
+
+
+def parse_date(text):
+    return datetime.strptime(text, '%Y.%m.%d').date()
+
+
+def parse_periods(text):
+    periods = [p.strip() for p in text.split(',') if p.strip()]
+    for p in periods:
+        if p not in REPORT_PERIODS:
+            raise argparse.ArgumentTypeError(f"未知的统计周期: {p}（可选 {', '.join(REPORT_PERIODS)}）")
+    return periods
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="批量导出精力分配饼图（不依赖 Qt）")
+    parser.add_argument('data_dirs', nargs='*', metavar='数据目录',
+                        help="包含 energy_data.json 的目录，默认为应用数据目录")
+    parser.add_argument('--start', type=parse_date, required=True, help="起始日期 YYYY.MM.DD")
+    parser.add_argument('--end', type=parse_date, default=None,
+                        help="结束日期 YYYY.MM.DD（含），默认为今天")
+    parser.add_argument('--periods', type=parse_periods, default=list(REPORT_PERIODS),
+                        help="统计周期，逗号分隔：day,week,month（默认全部）")
+    parser.add_argument('--format', choices=REPORT_FORMATS, default='png', help="输出格式")
+    parser.add_argument('--out', default='reports', help="输出目录（默认 ./reports）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="并行进程数（默认 CPU 核数，1 表示不启用进程池）")
+    parser.add_argument('--dpi', type=int, default=100, help="PNG 分辨率（默认 100）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    end = args.end or datetime.now().date()
+    if end < args.start:
+        print("结束日期早于起始日期", file=sys.stderr)
+        return 2
+    data_dirs = args.data_dirs or [get_app_data_dir()]
+
+    # 1. 主进程读取数据并汇总
+    t0 = time.perf_counter()
+    jobs = []
+    for data_dir, name in zip(data_dirs, output_names(data_dirs)):
+        if not os.path.exists(find_data_file(os.path.join(data_dir, 'energy_data.json'))):
+            print(f"跳过 {data_dir}：没有 energy_data.json", file=sys.stderr)
+            continue
+        # 只读打开：报表不在数据目录中创建任何文件
+        data_manager = DataManager(data_dir=data_dir, read_only=True)
+        try:
+            jobs.extend(collect_jobs(data_manager, args.start, end, args.periods,
+                                     os.path.join(args.out, name), args.format))
+        finally:
+            data_manager.close()
+    t1 = time.perf_counter()
+
+    # 2. 多进程渲染
+    workers = max(1, min(args.workers, len(jobs)))
+    count = render_jobs(jobs, workers, args.dpi) if jobs else 0
+    t2 = time.perf_counter()
+
+    render_time = t2 - t1
+    rate = count / render_time if render_time > 0 else 0.0
+    print(f"读取汇总 {t1 - t0:.2f} 秒，共 {len(jobs)} 个周期")
+    print(f"导出 {count} 张图表到 {os.path.abspath(args.out)}，"
+          f"{workers} 个进程，用时 {render_time:.2f} 秒，{rate:.1f} 张/秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())